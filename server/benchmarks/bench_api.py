@@ -0,0 +1,279 @@
+"""Latency benchmark for the /api routes against simulated system commands.
+
+Runs the FastAPI app in-process and drives every route with concurrent
+requests, reporting p50/p95/p99 latency and throughput. Results are written
+as JSON so runs from different commits can be compared:
+
+    uv run python benchmarks/bench_api.py --output before.json
+    uv run python benchmarks/bench_api.py --output after.json --compare before.json
+"""
+
+import asyncio
+import json
+import math
+import platform
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import httpx
+import typer
+
+from server.app import build_app
+from server.backends import NmcliWifiBackend, set_wifi_backend
+from server.routes import favourites, wifi
+from server.utils import applied, journal
+from server.utils.restarts import restart_scheduler
+from server.utils.subprocess_runner import set_command_simulator
+
+from simulated_commands import SimulatedCommands
+
+cli = typer.Typer()
+
+ASL_BODY = {
+    "node_number": "12345",
+    "node_password": "secret",
+    "callsign": "G1LRO",
+    "login_password": "login",
+}
+WIFI_BODY = {"ssid": "HomeNet", "password": "password", "country": "GB"}
+
+
+def favourites_body(i: int) -> dict[str, Any]:
+    # Vary the content so every save is a real change
+    return {"items": [{"name": f"Node {i}", "node_number": str(1000 + i)}]}
+
+
+@dataclass
+class RouteStats:
+    route: str
+    requests: int
+    errors: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    throughput_rps: float
+
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def wait_for_job(client: httpx.AsyncClient, job_id: str) -> httpx.Response:
+    while True:
+        response = await client.get(f"/api/configuration/jobs/{job_id}")
+        if response.json()["status"] not in ("pending", "running"):
+            return response
+        await asyncio.sleep(0.01)
+
+
+async def apply_configuration(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    response = await client.post(
+        "/api/configuration",
+        json={
+            "update_favourites": True,
+            "favourites": favourites_body(i),
+            "update_asl": True,
+            "asl": ASL_BODY,
+        },
+    )
+    return await wait_for_job(client, response.json()["job_id"])
+
+
+def build_scenarios(job_id: str) -> dict[str, Request]:
+    return {
+        "GET /api/wifi": lambda c, i: c.get("/api/wifi"),
+        "GET /api/wifi/networks": lambda c, i: c.get("/api/wifi/networks"),
+        "GET /api/favourites": lambda c, i: c.get("/api/favourites"),
+        "GET /api/asl": lambda c, i: c.get("/api/asl"),
+        "GET /api/configuration": lambda c, i: c.get("/api/configuration"),
+        "GET /api/configuration/jobs/{job_id}": lambda c, i: c.get(
+            f"/api/configuration/jobs/{job_id}"
+        ),
+        "GET /api/services/restarts": lambda c, i: c.get("/api/services/restarts"),
+        "POST /api/favourites": lambda c, i: c.post(
+            "/api/favourites", json=favourites_body(i)
+        ),
+        "POST /api/wifi": lambda c, i: c.post("/api/wifi", json=WIFI_BODY),
+        "POST /api/asl": lambda c, i: c.post("/api/asl", json=ASL_BODY),
+        "POST /api/configuration": lambda c, i: c.post(
+            "/api/configuration",
+            json={"update_favourites": True, "favourites": favourites_body(i)},
+        ),
+        "POST /api/configuration (until done)": apply_configuration,
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    route: str,
+    request: Request,
+    requests: int,
+    concurrency: int,
+) -> RouteStats:
+    # Start every route from cold caches so results don't depend on order
+    wifi.wifi_status_cache.invalidate()
+    wifi.wifi_scan_cache.invalidate()
+
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await request(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return RouteStats(
+        route=route,
+        requests=requests,
+        errors=errors,
+        mean_ms=sum(latencies) / len(latencies),
+        p50_ms=percentile(latencies, 50),
+        p95_ms=percentile(latencies, 95),
+        p99_ms=percentile(latencies, 99),
+        max_ms=latencies[-1],
+        throughput_rps=requests / wall,
+    )
+
+
+async def run_benchmark(
+    requests: int,
+    concurrency: int,
+    simulator: SimulatedCommands,
+    route_filter: str | None,
+) -> list[RouteStats]:
+    set_command_simulator(simulator)
+    set_wifi_backend(NmcliWifiBackend())
+    app = build_app(serve=False)
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            seed = await client.post(
+                "/api/configuration",
+                json={"update_favourites": True, "favourites": favourites_body(0)},
+            )
+            scenarios = build_scenarios(seed.json()["job_id"])
+            for route, request in scenarios.items():
+                if route_filter and route_filter not in route:
+                    continue
+                stats = await run_scenario(
+                    client, route, request, requests, concurrency
+                )
+                print(
+                    f"{stats.route:45} p50 {stats.p50_ms:9.1f} ms"
+                    f"  p95 {stats.p95_ms:9.1f} ms  p99 {stats.p99_ms:9.1f} ms"
+                    f"  {stats.throughput_rps:8.1f} req/s  errors {stats.errors}"
+                )
+                results.append(stats)
+    set_command_simulator(None)
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+
+def print_comparison(results: list[RouteStats], baseline_path: Path) -> None:
+    baseline = {r["route"]: r for r in json.loads(baseline_path.read_text())["results"]}
+    print(f"\nChange in p50 / p95 against {baseline_path}:")
+    for stats in results:
+        before = baseline.get(stats.route)
+        if before is None:
+            continue
+        print(
+            f"{stats.route:45} p50 {stats.p50_ms - before['p50_ms']:+9.1f} ms"
+            f"  p95 {stats.p95_ms - before['p95_ms']:+9.1f} ms"
+        )
+
+
+@cli.command()
+def main(
+    requests: int = typer.Option(50, help="Requests per route"),
+    concurrency: int = typer.Option(8, help="Concurrent clients per route"),
+    time_scale: float = typer.Option(
+        0.1, help="Multiplier applied to simulated command latencies"
+    ),
+    failure_rate: float = typer.Option(
+        0.0, help="Probability that any simulated command fails"
+    ),
+    restart_window: float | None = typer.Option(
+        None, help="Override the restart coalescing window in seconds"
+    ),
+    route: str | None = typer.Option(None, help="Only run routes containing this"),
+    seed: int = typer.Option(0, help="Random seed for latency jitter and failures"),
+    output: Path | None = typer.Option(None, help="Write JSON results here"),
+    compare: Path | None = typer.Option(None, help="Baseline JSON to compare with"),
+):
+    simulator = SimulatedCommands(time_scale=time_scale, seed=seed)
+    for profile in simulator.profiles.values():
+        profile.failure_rate = failure_rate
+    if restart_window is not None:
+        restart_scheduler.window = restart_window
+
+    with tempfile.TemporaryDirectory() as tmp:
+        favourites.FAVOURITES_PATH = Path(tmp) / "favourites.txt"
+        # Keep the benchmark's jobs out of the journal a real start resumes
+        journal.APPLY_JOURNAL_PATH = Path(tmp) / "apply-journal"
+        applied.APPLIED_STATE_PATH = Path(tmp) / "applied.json"
+        results = asyncio.run(run_benchmark(requests, concurrency, simulator, route))
+
+    if output is not None:
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "requests": requests,
+                "concurrency": concurrency,
+                "time_scale": time_scale,
+                "failure_rate": failure_rate,
+                "seed": seed,
+                "command_calls": simulator.calls,
+            },
+            "results": [asdict(stats) for stats in results],
+        }
+        output.write_text(json.dumps(report, indent=2))
+    if compare is not None:
+        print_comparison(results, compare)
+
+
+if __name__ == "__main__":
+    cli()
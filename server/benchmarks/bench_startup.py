@@ -0,0 +1,196 @@
+"""Startup-time benchmark for the `server` CLI and app.
+
+Each scenario runs in a fresh interpreter several times and the median wall
+time is reported, so cold-import costs are measured rather than cached. The
+run fails if `server.main` pulls in the web stack at import time, or if a
+scenario's median exceeds its budget:
+
+    uv run python benchmarks/bench_startup.py --output before.json
+    uv run python benchmarks/bench_startup.py --compare before.json --budget import=150
+"""
+
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import typer
+
+cli = typer.Typer()
+
+# Modules that only `serve` and `export-schema` should need
+HEAVY_MODULES = ("fastapi", "pydantic", "starlette", "uvicorn", "httpx")
+
+FIRST_REQUEST = """
+import asyncio, httpx
+from server.app import build_app
+
+async def main():
+    app = build_app(serve=False)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        (await c.get("/metrics")).raise_for_status()
+
+asyncio.run(main())
+"""
+
+SCENARIOS: dict[str, list[str]] = {
+    "interpreter": ["-c", "pass"],
+    "import": ["-c", "import server.main"],
+    "help": ["-c", "from server.main import cli; cli()", "--help"],
+    "export-schema": ["-c", "from server.main import cli; cli()", "export-schema"],
+    "first-request": ["-c", FIRST_REQUEST],
+}
+
+
+@dataclass
+class StartupStats:
+    scenario: str
+    runs: int
+    median_ms: float
+    min_ms: float
+    max_ms: float
+
+
+def time_scenario(name: str, args: list[str], runs: int) -> StartupStats:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        samples.append((time.perf_counter() - started) * 1000)
+    return StartupStats(
+        scenario=name,
+        runs=runs,
+        median_ms=round(statistics.median(samples), 1),
+        min_ms=round(min(samples), 1),
+        max_ms=round(max(samples), 1),
+    )
+
+
+def heavy_modules_on_import() -> list[str]:
+    """Heavy packages that `import server.main` loads as a side effect"""
+    probe = (
+        "import json, sys, server.main; "
+        "print(json.dumps(sorted({m.split('.')[0] for m in sys.modules})))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe], check=True, capture_output=True, text=True
+    )
+    loaded = set(json.loads(result.stdout))
+    return [module for module in HEAVY_MODULES if module in loaded]
+
+
+def slowest_imports(module: str, count: int) -> list[tuple[str, float]]:
+    """Top-level packages with the most time spent importing their modules"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    totals: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        # Sum self times so nested imports are not counted twice
+        package = parts[2].strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(parts[0]) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def parse_budgets(budgets: list[str]) -> dict[str, float]:
+    parsed = {}
+    for budget in budgets:
+        name, _, value = budget.partition("=")
+        if name not in SCENARIOS or not value:
+            raise typer.BadParameter(f"Expected <scenario>=<ms>, got {budget!r}")
+        parsed[name] = float(value)
+    return parsed
+
+
+def print_comparison(results: list[StartupStats], baseline_path: Path) -> None:
+    baseline = {
+        r["scenario"]: r for r in json.loads(baseline_path.read_text())["results"]
+    }
+    print(f"\nChange in median against {baseline_path}:")
+    for stats in results:
+        before = baseline.get(stats.scenario)
+        if before is None:
+            continue
+        print(f"{stats.scenario:15} {stats.median_ms - before['median_ms']:+9.1f} ms")
+
+
+@cli.command()
+def main(
+    runs: int = typer.Option(7, help="Fresh interpreters per scenario"),
+    scenario: list[str] = typer.Option(
+        [], help="Only run these scenarios (repeatable)"
+    ),
+    budget: list[str] = typer.Option(
+        [], help="Fail if a scenario's median exceeds <scenario>=<ms> (repeatable)"
+    ),
+    top: int = typer.Option(8, help="Slowest top-level imports of server.app to show"),
+    output: Path | None = typer.Option(None, help="Write JSON results here"),
+    compare: Path | None = typer.Option(None, help="Baseline JSON to compare with"),
+):
+    budgets = parse_budgets(budget)
+    names = scenario or list(SCENARIOS)
+
+    results = []
+    for name in names:
+        stats = time_scenario(name, SCENARIOS[name], runs)
+        results.append(stats)
+        print(
+            f"{name:15} median {stats.median_ms:8.1f} ms"
+            f"  min {stats.min_ms:8.1f} ms  max {stats.max_ms:8.1f} ms"
+        )
+
+    if top:
+        print("\nSlowest imports under server.app:")
+        for package, ms in slowest_imports("server.app", top):
+            print(f"{package:25} {ms:8.1f} ms")
+
+    heavy = heavy_modules_on_import()
+
+    if output is not None:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "runs": runs,
+                "heavy_modules_on_import": heavy,
+            },
+            "results": [asdict(stats) for stats in results],
+        }
+        output.write_text(json.dumps(report, indent=2))
+    if compare is not None:
+        print_comparison(results, compare)
+
+    failures = []
+    if heavy:
+        failures.append(f"`import server.main` loaded {', '.join(heavy)}")
+    for stats in results:
+        limit = budgets.get(stats.scenario)
+        if limit is not None and stats.median_ms > limit:
+            failures.append(
+                f"{stats.scenario} took {stats.median_ms:.1f} ms (budget {limit:.0f} ms)"
+            )
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if failures:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
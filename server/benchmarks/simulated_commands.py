@@ -0,0 +1,121 @@
+"""Simulated system commands for running the server without a Pi.
+
+Install with `server.utils.subprocess_runner.set_command_simulator`. Each
+command sleeps for a configurable latency and fails at a configurable rate,
+and returns output shaped like the real tool's so the routes parse it.
+"""
+
+import asyncio
+import random
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from server.utils.subprocess_runner import CommandResult
+
+
+@dataclass
+class CommandProfile:
+    latency: float
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+
+
+# Rough wall times measured on a Pi Zero 2 W, sudo/PAM overhead included
+DEFAULT_PROFILES = {
+    "nmcli": CommandProfile(latency=0.25, jitter=0.05),
+    "nmcli-connect": CommandProfile(latency=4.0, jitter=1.0),
+    "nmcli-scan": CommandProfile(latency=0.4, jitter=0.1),
+    "nmcli-rescan": CommandProfile(latency=3.0, jitter=0.5),
+    "iw": CommandProfile(latency=0.12, jitter=0.02),
+    "systemctl": CommandProfile(latency=0.15, jitter=0.03),
+    "systemctl-is-active": CommandProfile(latency=0.04, jitter=0.01),
+    "systemctl-show": CommandProfile(latency=0.04, jitter=0.01),
+    "chpasswd": CommandProfile(latency=0.3, jitter=0.05),
+    "allmon3-passwd": CommandProfile(latency=0.6, jitter=0.1),
+    "configure-asl3": CommandProfile(latency=8.0, jitter=1.0),
+}
+
+SCAN_OUTPUT = (
+    " :HomeNet:AA\\:BB\\:CC\\:00\\:00\\:01:82:WPA2:6\n"
+    " :HomeNet:AA\\:BB\\:CC\\:00\\:00\\:02:64:WPA2:36\n"
+    " :Neighbour:AA\\:BB\\:CC\\:00\\:00\\:03:41:WPA1 WPA2:11\n"
+    " :Cafe Guest:AA\\:BB\\:CC\\:00\\:00\\:04:30::1\n"
+)
+
+
+def classify(args: List[str]) -> str:
+    """Map a command line to the profile that simulates it"""
+    if args and args[0] == "sudo":
+        args = args[1:]
+    if not args:
+        return ""
+    name = args[0].rsplit("/", 1)[-1]
+    if name == "configure-asl3.sh":
+        return "configure-asl3"
+    if name == "nmcli" and "connect" in args:
+        return "nmcli-connect"
+    if name == "nmcli" and "list" in args:
+        return "nmcli-rescan" if "yes" in args else "nmcli-scan"
+    if name == "systemctl" and "is-active" in args:
+        return "systemctl-is-active"
+    if name == "systemctl" and "show" in args:
+        return "systemctl-show"
+    return name
+
+
+def simulated_output(kind: str, args: List[str]) -> str:
+    if kind == "nmcli" and "active,ssid" in args:
+        return "yes:HomeNet\nno:Neighbour\n"
+    if kind in ("nmcli-scan", "nmcli-rescan"):
+        return SCAN_OUTPUT
+    if kind == "iw":
+        return "global\ncountry GB: DFS-ETSI\n"
+    if kind == "systemctl-is-active":
+        return "active\n"
+    if kind == "systemctl-show":
+        # A new instance every time, so a restart is seen as finished at once
+        return f"ActiveState=active\nInvocationID={uuid.uuid4().hex}\n"
+    return ""
+
+
+@dataclass
+class SimulatedCommands:
+    """Command simulator with per-command latency and failure rates"""
+
+    profiles: dict[str, CommandProfile] = field(
+        default_factory=lambda: dict(DEFAULT_PROFILES)
+    )
+    time_scale: float = 1.0
+    default: CommandProfile = field(
+        default_factory=lambda: CommandProfile(latency=0.05)
+    )
+    seed: int | None = None
+    calls: dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.seed)
+
+    async def __call__(
+        self, args: List[str], timeout: int, input_text: Optional[str]
+    ) -> CommandResult:
+        kind = classify(args)
+        profile = self.profiles.get(kind, self.default)
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+
+        latency = max(0.0, self._random.gauss(profile.latency, profile.jitter))
+        await asyncio.sleep(latency * self.time_scale)
+
+        if self._random.random() < profile.failure_rate:
+            return CommandResult(
+                success=False,
+                stdout="",
+                stderr=f"simulated failure of {kind}",
+                return_code=1,
+            )
+        return CommandResult(
+            success=True,
+            stdout=simulated_output(kind, args),
+            stderr="",
+            return_code=0,
+        )
@@ -0,0 +1,91 @@
+import json
+from contextlib import asynccontextmanager
+from importlib.resources import files
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from .backends import close_wifi_backend
+from .routes.wifi import router as wifi_router
+from .routes.favourites import router as favourites_router
+from .routes.asl import router as asl_router
+from .routes.configuration import (
+    resume_configuration_jobs,
+    router as configuration_router,
+)
+from .routes.services import router as services_router
+from .routes.health import router as health_router, state_poller
+from .routes.events import router as events_router, network_monitor
+from .utils.jobs import job_manager
+from .utils.journal import apply_journal
+from .utils.metrics import MetricsMiddleware, registry
+from .utils.privileged import close_privileged_client
+from .utils.static import PrecompressedStaticFiles
+
+# Written by `server export-schema` during the wheel build; absent in a
+# source checkout, where the schema is generated on first request instead
+PREBUILT_SCHEMA = "openapi.json"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    state_poller.start()
+    network_monitor.start()
+    resume_configuration_jobs()
+    yield
+    await network_monitor.stop()
+    await state_poller.stop()
+    await job_manager.shutdown()
+    apply_journal.close()
+    await close_wifi_backend()
+    close_privileged_client()
+
+
+def use_prebuilt_schema(app: FastAPI) -> None:
+    """Serve the schema shipped in the wheel rather than generating it"""
+    resource = files("server").joinpath(PREBUILT_SCHEMA)
+    if not resource.is_file():
+        return
+    generate = app.openapi
+
+    def openapi() -> dict[str, Any]:
+        if app.openapi_schema is not None:
+            return app.openapi_schema
+        try:
+            schema = json.loads(resource.read_text())
+        except (OSError, ValueError):
+            return generate()
+        app.openapi_schema = schema
+        return schema
+
+    app.openapi = openapi
+
+
+def build_app(serve: bool):
+    app = FastAPI(title="RNL-Z2 Configuration API", lifespan=lifespan)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(
+            registry.render(), media_type="text/plain; version=0.0.4"
+        )
+
+    app.include_router(wifi_router)
+    app.include_router(favourites_router)
+    app.include_router(asl_router)
+    app.include_router(configuration_router)
+    app.include_router(services_router)
+    app.include_router(health_router)
+    app.include_router(events_router)
+
+    if serve:
+        use_prebuilt_schema(app)
+        app.mount(
+            "/",
+            PrecompressedStaticFiles(packages=[("server", "build")], html=True),
+            name="spa",
+        )
+
+    return app
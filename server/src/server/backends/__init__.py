@@ -0,0 +1,58 @@
+import os
+
+from .base import ScannedNetwork, WifiBackend, WifiProfile
+from .fake import FakeWifiBackend
+from .nmcli import NmcliWifiBackend
+
+# Backend used by the WiFi routes: "nmcli", "dbus" or "fake"
+WIFI_BACKEND = os.environ.get("RLN_WIFI_BACKEND", "nmcli")
+
+_wifi_backend: WifiBackend | None = None
+
+
+def create_wifi_backend(name: str) -> WifiBackend:
+    """Create a WiFi backend by name"""
+    if name == "nmcli":
+        return NmcliWifiBackend()
+    if name == "dbus":
+        from .dbus import DBusWifiBackend
+
+        return DBusWifiBackend()
+    if name == "fake":
+        return FakeWifiBackend()
+    raise ValueError(f"Unknown WiFi backend: {name}")
+
+
+def get_wifi_backend() -> WifiBackend:
+    """Return the process-wide WiFi backend, creating it on first use"""
+    global _wifi_backend
+    if _wifi_backend is None:
+        _wifi_backend = create_wifi_backend(WIFI_BACKEND)
+    return _wifi_backend
+
+
+def set_wifi_backend(backend: WifiBackend | None) -> None:
+    """Replace the process-wide WiFi backend (None resets to the default)"""
+    global _wifi_backend
+    _wifi_backend = backend
+
+
+async def close_wifi_backend() -> None:
+    """Close the process-wide WiFi backend if one was created"""
+    global _wifi_backend
+    if _wifi_backend is not None:
+        await _wifi_backend.close()
+        _wifi_backend = None
+
+
+__all__ = [
+    "ScannedNetwork",
+    "WifiBackend",
+    "WifiProfile",
+    "NmcliWifiBackend",
+    "FakeWifiBackend",
+    "create_wifi_backend",
+    "get_wifi_backend",
+    "set_wifi_backend",
+    "close_wifi_backend",
+]
@@ -0,0 +1,75 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+
+@dataclass
+class ScannedNetwork:
+    """One access point seen in a WiFi scan"""
+
+    ssid: str
+    bssid: str
+    signal: int
+    security: str
+    channel: int | None = None
+    in_use: bool = False
+
+
+@dataclass
+class WifiProfile:
+    """A saved NetworkManager connection for a WiFi network"""
+
+    name: str
+    ssid: str
+    active: bool = False
+
+
+class WifiBackend(ABC):
+    """Interface to the network stack used by the WiFi routes"""
+
+    name: str = "base"
+
+    @abstractmethod
+    async def get_active_ssid(self) -> str | None:
+        """Return the SSID of the active WiFi connection, if any"""
+
+    @abstractmethod
+    async def get_country(self) -> str | None:
+        """Return the current WiFi regulatory country code, if known"""
+
+    @abstractmethod
+    async def set_country(self, country: str) -> tuple[bool, str]:
+        """Set the WiFi regulatory country code"""
+
+    @abstractmethod
+    async def connect(
+        self, ssid: str, password: str, bssid: str | None = None
+    ) -> tuple[bool, str]:
+        """Connect to a WiFi network
+
+        With a `bssid` from a recent scan, join that access point, on its
+        channel, without NetworkManager looking the network up again. The
+        saved profile is not locked to it.
+        """
+
+    @abstractmethod
+    async def scan(self, rescan: bool = False) -> list[ScannedNetwork]:
+        """List visible access points, asking the radio to rescan first if `rescan`"""
+
+    @abstractmethod
+    async def list_profiles(self) -> list[WifiProfile]:
+        """List saved WiFi connection profiles"""
+
+    @abstractmethod
+    async def add_profile(self, ssid: str, password: str) -> tuple[bool, str]:
+        """Save a profile for `ssid` without connecting, replacing any existing one"""
+
+    @abstractmethod
+    async def remove_profile(self, name: str) -> tuple[bool, str]:
+        """Delete a saved profile"""
+
+    @abstractmethod
+    async def activate_profile(self, name: str) -> tuple[bool, str]:
+        """Connect using a saved profile"""
+
+    async def close(self) -> None:
+        """Release any resources held by the backend"""
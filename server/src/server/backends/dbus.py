@@ -0,0 +1,446 @@
+import asyncio
+import os
+from typing import Any
+
+from server.backends.base import ScannedNetwork, WifiBackend, WifiProfile
+from server.backends.nmcli import NM_WIFI_TYPE, NmcliWifiBackend
+from server.utils.cache import AsyncTTLCache
+from server.utils.deadline import time_left
+
+NM_BUS_NAME = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+NM_INTERFACE = "org.freedesktop.NetworkManager"
+NM_DEVICE_INTERFACE = "org.freedesktop.NetworkManager.Device"
+NM_WIRELESS_INTERFACE = "org.freedesktop.NetworkManager.Device.Wireless"
+NM_ACCESS_POINT_INTERFACE = "org.freedesktop.NetworkManager.AccessPoint"
+NM_ACTIVE_CONNECTION_INTERFACE = "org.freedesktop.NetworkManager.Connection.Active"
+NM_SETTINGS_PATH = "/org/freedesktop/NetworkManager/Settings"
+NM_SETTINGS_INTERFACE = "org.freedesktop.NetworkManager.Settings"
+NM_CONNECTION_INTERFACE = "org.freedesktop.NetworkManager.Settings.Connection"
+PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+
+NM_DEVICE_TYPE_WIFI = 2
+NM_ACTIVE_CONNECTION_STATE_ACTIVATED = 2
+NM_ACTIVE_CONNECTION_STATE_DEACTIVATED = 4
+
+# NMDeviceStateReason values for a refused password (NO_SECRETS, as nmcli
+# reports it), and a missing network. Supplicant disconnects, failures and
+# timeouts can be radio trouble, so they stay retryable.
+NM_DEVICE_STATE_REASON_NO_SECRETS = 7
+NM_DEVICE_STATE_REASON_SSID_NOT_FOUND = 53
+
+NM_802_11_AP_FLAGS_PRIVACY = 0x1
+NM_802_11_AP_SEC_KEY_MGMT_PSK = 0x100
+NM_802_11_AP_SEC_KEY_MGMT_SAE = 0x400
+
+CONNECT_TIMEOUT = 60
+CONNECT_POLL_INTERVAL = 0.25
+SCAN_TIMEOUT = 15
+SCAN_POLL_INTERVAL = 0.5
+
+# Seconds the regulatory country is served before `iw` is asked again; the
+# same setting as the WiFi status cache, so a change made outside the
+# server shows up as soon as the status does
+COUNTRY_TTL = float(os.environ.get("RLN_WIFI_STATUS_TTL", "5"))
+
+
+def frequency_to_channel(frequency: int) -> int | None:
+    """Convert an access point frequency in MHz to its channel number"""
+    if frequency == 2484:
+        return 14
+    if 2412 <= frequency <= 2472:
+        return (frequency - 2407) // 5
+    if 5000 < frequency < 5900:
+        return (frequency - 5000) // 5
+    if 5950 < frequency <= 7115:
+        return (frequency - 5950) // 5
+    return None
+
+
+def describe_security(flags: int, wpa_flags: int, rsn_flags: int) -> str:
+    """Summarise access point security flags the way nmcli's SECURITY column does"""
+    parts = []
+    if flags & NM_802_11_AP_FLAGS_PRIVACY and not wpa_flags and not rsn_flags:
+        parts.append("WEP")
+    if wpa_flags:
+        parts.append("WPA1")
+    if rsn_flags & NM_802_11_AP_SEC_KEY_MGMT_SAE:
+        parts.append("WPA3")
+    elif rsn_flags:
+        parts.append("WPA2")
+    return " ".join(parts)
+
+
+def choose_key_mgmt(rsn_flags: int) -> str:
+    """key-mgmt for a password network: SAE only when the AP offers no PSK"""
+    if rsn_flags & NM_802_11_AP_SEC_KEY_MGMT_SAE and not (
+        rsn_flags & NM_802_11_AP_SEC_KEY_MGMT_PSK
+    ):
+        return "sae"
+    return "wpa-psk"
+
+
+class DBusError(RuntimeError):
+    """Raised when NetworkManager returns a D-Bus error reply"""
+
+
+class DBusWifiBackend(WifiBackend):
+    """Backend that talks to NetworkManager over a long-lived system bus connection.
+
+    Requires the optional `dbus-fast` dependency (`pip install server[dbus]`)
+    and a polkit rule allowing the server user to control NetworkManager.
+    The regulatory domain is not exposed by NetworkManager, so country reads
+    and writes still go through `iw`; reads are cached for COUNTRY_TTL
+    and dropped on every successful set. Saved profiles are managed
+    through `nmcli` as well.
+    """
+
+    name = "dbus"
+
+    def __init__(self) -> None:
+        self._bus: Any = None
+        self._bus_lock = asyncio.Lock()
+        self._device_path: str | None = None
+        self._nmcli = NmcliWifiBackend()
+        self._country = AsyncTTLCache(self._nmcli.get_country, ttl=COUNTRY_TTL)
+
+    async def _get_bus(self) -> Any:
+        async with self._bus_lock:
+            if self._bus is None or not self._bus.connected:
+                from dbus_fast import BusType
+                from dbus_fast.aio import MessageBus
+
+                self._bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
+                self._device_path = None
+            return self._bus
+
+    async def _call(
+        self,
+        path: str,
+        interface: str,
+        member: str,
+        signature: str = "",
+        body: list[Any] | None = None,
+    ) -> list[Any]:
+        from dbus_fast import Message, MessageType
+
+        bus = await self._get_bus()
+        reply = await bus.call(
+            Message(
+                destination=NM_BUS_NAME,
+                path=path,
+                interface=interface,
+                member=member,
+                signature=signature,
+                body=body or [],
+            )
+        )
+        if reply.message_type == MessageType.ERROR:
+            detail = reply.body[0] if reply.body else ""
+            raise DBusError(f"{reply.error_name}: {detail}")
+        return reply.body
+
+    async def _get_property(self, path: str, interface: str, prop: str) -> Any:
+        body = await self._call(
+            path, PROPERTIES_INTERFACE, "Get", "ss", [interface, prop]
+        )
+        return body[0].value
+
+    async def _get_wifi_device(self) -> str | None:
+        if self._device_path is not None:
+            return self._device_path
+        (devices,) = await self._call(NM_PATH, NM_INTERFACE, "GetDevices")
+        for device in devices:
+            device_type = await self._get_property(
+                device, NM_DEVICE_INTERFACE, "DeviceType"
+            )
+            if device_type == NM_DEVICE_TYPE_WIFI:
+                self._device_path = device
+                return device
+        return None
+
+    async def get_active_ssid(self) -> str | None:
+        try:
+            device = await self._get_wifi_device()
+            if device is None:
+                return None
+            access_point = await self._get_property(
+                device, NM_WIRELESS_INTERFACE, "ActiveAccessPoint"
+            )
+            if not access_point or access_point == "/":
+                return None
+            ssid = await self._get_property(
+                access_point, NM_ACCESS_POINT_INTERFACE, "Ssid"
+            )
+        except (DBusError, OSError):
+            return None
+        return bytes(ssid).decode(errors="replace") or None
+
+    async def get_country(self) -> str | None:
+        return await self._country.get()
+
+    async def set_country(self, country: str) -> tuple[bool, str]:
+        success, message = await self._nmcli.set_country(country)
+        if success:
+            self._country.invalidate()
+        return success, message
+
+    async def _find_access_point(
+        self, device: str, ssid: str, bssid: str | None
+    ) -> tuple[str, int]:
+        """The access point to pin, and the RSN flags `ssid` is offered with
+
+        The path is that of the access point with `bssid`, or "/" to let
+        NetworkManager pick. The flags are 0 if no access point for `ssid`
+        is visible.
+        """
+        (access_points,) = await self._call(
+            device, NM_WIRELESS_INTERFACE, "GetAllAccessPoints"
+        )
+        rsn_flags = 0
+        for access_point in access_points:
+            try:
+                (props,) = await self._call(
+                    access_point,
+                    PROPERTIES_INTERFACE,
+                    "GetAll",
+                    "s",
+                    [NM_ACCESS_POINT_INTERFACE],
+                )
+            except DBusError:
+                continue
+            if bytes(props["Ssid"].value) != ssid.encode():
+                continue
+            rsn_flags = props["RsnFlags"].value
+            if bssid is not None and props["HwAddress"].value.lower() == bssid.lower():
+                return access_point, rsn_flags
+        return "/", rsn_flags
+
+    async def _find_connection(
+        self, ssid: str
+    ) -> tuple[str, dict[str, dict[str, Any]]] | None:
+        """Path and settings of the saved WiFi connection for `ssid`, if any"""
+        (connections,) = await self._call(
+            NM_SETTINGS_PATH, NM_SETTINGS_INTERFACE, "ListConnections"
+        )
+        for connection in connections:
+            try:
+                (settings,) = await self._call(
+                    connection, NM_CONNECTION_INTERFACE, "GetSettings"
+                )
+            except DBusError:
+                continue
+            wireless = settings.get(NM_WIFI_TYPE)
+            if (
+                settings["connection"]["type"].value == NM_WIFI_TYPE
+                and wireless is not None
+                and "ssid" in wireless
+                and bytes(wireless["ssid"].value) == ssid.encode()
+            ):
+                return connection, settings
+        return None
+
+    async def connect(
+        self, ssid: str, password: str, bssid: str | None = None
+    ) -> tuple[bool, str]:
+        from dbus_fast import Variant
+
+        try:
+            device = await self._get_wifi_device()
+            if device is None:
+                return False, "No WiFi device found"
+            # Naming the access point pins it without setting a BSSID in the
+            # saved connection
+            access_point, rsn_flags = await self._find_access_point(device, ssid, bssid)
+            security = None
+            if password:
+                security = {
+                    "key-mgmt": Variant("s", choose_key_mgmt(rsn_flags)),
+                    "psk": Variant("s", password),
+                }
+
+            # Like nmcli, reuse the saved connection for the network
+            existing = await self._find_connection(ssid)
+            if existing is not None:
+                connection, settings = existing
+                if security is None:
+                    settings.pop("802-11-wireless-security", None)
+                else:
+                    settings["802-11-wireless-security"] = {
+                        **settings.get("802-11-wireless-security", {}),
+                        **security,
+                    }
+                await self._call(
+                    connection,
+                    NM_CONNECTION_INTERFACE,
+                    "Update",
+                    "a{sa{sv}}",
+                    [settings],
+                )
+                (active_path,) = await self._call(
+                    NM_PATH,
+                    NM_INTERFACE,
+                    "ActivateConnection",
+                    "ooo",
+                    [connection, device, access_point],
+                )
+                return await self._wait_for_activation(device, active_path, ssid)
+
+            settings: dict[str, dict[str, Any]] = {
+                "connection": {
+                    "id": Variant("s", ssid),
+                    "type": Variant("s", NM_WIFI_TYPE),
+                },
+                NM_WIFI_TYPE: {
+                    "ssid": Variant("ay", ssid.encode()),
+                    "mode": Variant("s", "infrastructure"),
+                },
+            }
+            if security is not None:
+                settings["802-11-wireless-security"] = security
+            connection, active_path = await self._call(
+                NM_PATH,
+                NM_INTERFACE,
+                "AddAndActivateConnection",
+                "a{sa{sv}}oo",
+                [settings, device, access_point],
+            )
+            success, message = await self._wait_for_activation(
+                device, active_path, ssid
+            )
+            if not success:
+                # A new profile that never connected must not autoconnect later
+                await self._delete_connection(connection)
+            return success, message
+        except (DBusError, OSError) as e:
+            return False, str(e)
+
+    async def _delete_connection(self, connection: str) -> None:
+        try:
+            await self._call(connection, NM_CONNECTION_INTERFACE, "Delete")
+        except DBusError:
+            pass
+
+    async def _wait_for_activation(
+        self, device: str, active_path: str, ssid: str
+    ) -> tuple[bool, str]:
+        loop = asyncio.get_running_loop()
+        timeout = time_left(CONNECT_TIMEOUT)
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            try:
+                state = await self._get_property(
+                    active_path, NM_ACTIVE_CONNECTION_INTERFACE, "State"
+                )
+            except DBusError:
+                # The active connection object disappears when activation fails
+                return False, await self._activation_failure(device, ssid)
+            if state == NM_ACTIVE_CONNECTION_STATE_ACTIVATED:
+                return True, f"Connected to {ssid}"
+            if state == NM_ACTIVE_CONNECTION_STATE_DEACTIVATED:
+                return False, await self._activation_failure(device, ssid)
+            await asyncio.sleep(CONNECT_POLL_INTERVAL)
+        return False, f"Timed out after {timeout:.0f} seconds connecting to {ssid}"
+
+    async def _activation_failure(self, device: str, ssid: str) -> str:
+        """Why activation failed, worded like nmcli so callers can classify it"""
+        try:
+            _, reason = await self._get_property(
+                device, NM_DEVICE_INTERFACE, "StateReason"
+            )
+        except DBusError:
+            return f"Activation of {ssid} failed"
+        if reason == NM_DEVICE_STATE_REASON_NO_SECRETS:
+            return (
+                f"Activation of {ssid} failed: Secrets were required, but not provided"
+            )
+        if reason == NM_DEVICE_STATE_REASON_SSID_NOT_FOUND:
+            return f"Activation of {ssid} failed: No network with SSID '{ssid}' found"
+        return f"Activation of {ssid} failed (reason {reason})"
+
+    async def scan(self, rescan: bool = False) -> list[ScannedNetwork]:
+        try:
+            return await self._scan(rescan)
+        except (OSError, EOFError) as e:
+            # The bus is down or went away mid-call; fail like nmcli does
+            raise RuntimeError(f"WiFi scan failed: {e}") from e
+
+    async def _scan(self, rescan: bool) -> list[ScannedNetwork]:
+        device = await self._get_wifi_device()
+        if device is None:
+            return []
+        if rescan:
+            await self._request_scan(device)
+
+        (access_points,) = await self._call(
+            device, NM_WIRELESS_INTERFACE, "GetAllAccessPoints"
+        )
+        active = await self._get_property(
+            device, NM_WIRELESS_INTERFACE, "ActiveAccessPoint"
+        )
+        networks = []
+        for access_point in access_points:
+            try:
+                (props,) = await self._call(
+                    access_point,
+                    PROPERTIES_INTERFACE,
+                    "GetAll",
+                    "s",
+                    [NM_ACCESS_POINT_INTERFACE],
+                )
+            except DBusError:
+                # Access points can vanish between listing and reading them
+                continue
+            networks.append(
+                ScannedNetwork(
+                    ssid=bytes(props["Ssid"].value).decode(errors="replace"),
+                    bssid=props["HwAddress"].value,
+                    signal=props["Strength"].value,
+                    security=describe_security(
+                        props["Flags"].value,
+                        props["WpaFlags"].value,
+                        props["RsnFlags"].value,
+                    ),
+                    channel=frequency_to_channel(props["Frequency"].value),
+                    in_use=access_point == active,
+                )
+            )
+        return networks
+
+    async def _request_scan(self, device: str) -> None:
+        """Ask NetworkManager to rescan and wait until LastScan moves on"""
+        last_scan = await self._get_property(device, NM_WIRELESS_INTERFACE, "LastScan")
+        try:
+            await self._call(
+                device, NM_WIRELESS_INTERFACE, "RequestScan", "a{sv}", [{}]
+            )
+        except DBusError:
+            # NetworkManager refuses scans while one is running or was just done
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + time_left(SCAN_TIMEOUT)
+        while loop.time() < deadline:
+            await asyncio.sleep(SCAN_POLL_INTERVAL)
+            current = await self._get_property(
+                device, NM_WIRELESS_INTERFACE, "LastScan"
+            )
+            if current != last_scan:
+                return
+
+    async def list_profiles(self) -> list[WifiProfile]:
+        return await self._nmcli.list_profiles()
+
+    async def add_profile(self, ssid: str, password: str) -> tuple[bool, str]:
+        return await self._nmcli.add_profile(ssid, password)
+
+    async def remove_profile(self, name: str) -> tuple[bool, str]:
+        return await self._nmcli.remove_profile(name)
+
+    async def activate_profile(self, name: str) -> tuple[bool, str]:
+        return await self._nmcli.activate_profile(name)
+
+    async def close(self) -> None:
+        if self._bus is not None:
+            self._bus.disconnect()
+            self._bus = None
+            self._device_path = None
@@ -0,0 +1,111 @@
+import asyncio
+
+from server.backends.base import ScannedNetwork, WifiBackend, WifiProfile
+
+
+class FakeWifiBackend(WifiBackend):
+    """In-process backend for tests and local development.
+
+    Holds the WiFi state in memory. If known_networks is given, connect only
+    succeeds for SSIDs in it with the matching password, and saved profiles
+    (SSID -> password) activate the same way. Every call is appended to
+    `calls` so tests can assert on what the routes did.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        ssid: str | None = None,
+        country: str | None = "GB",
+        known_networks: dict[str, str] | None = None,
+        latency: float = 0.0,
+        networks: list[ScannedNetwork] | None = None,
+        profiles: dict[str, str] | None = None,
+    ):
+        self.ssid = ssid
+        self.country = country
+        self.known_networks = known_networks
+        self.latency = latency
+        self.networks = networks or []
+        self.profiles = dict(profiles or {})
+        self.calls: list[tuple[str, ...]] = []
+        self.closed = False
+
+    async def _simulate(self, *call: str) -> None:
+        self.calls.append(call)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get_active_ssid(self) -> str | None:
+        await self._simulate("get_active_ssid")
+        return self.ssid
+
+    async def get_country(self) -> str | None:
+        await self._simulate("get_country")
+        return self.country
+
+    async def set_country(self, country: str) -> tuple[bool, str]:
+        await self._simulate("set_country", country)
+        self.country = country.upper()
+        return True, f"Country set to {self.country}"
+
+    def _join(self, ssid: str, password: str) -> tuple[bool, str]:
+        if self.known_networks is not None:
+            if ssid not in self.known_networks:
+                return False, f"No network with SSID '{ssid}' found."
+            if self.known_networks[ssid] != password:
+                return False, "Secrets were required, but not provided."
+        self.ssid = ssid
+        return True, f"Connected to {ssid}"
+
+    async def connect(
+        self, ssid: str, password: str, bssid: str | None = None
+    ) -> tuple[bool, str]:
+        await self._simulate("connect", ssid, *([bssid] if bssid else []))
+        success, message = self._join(ssid, password)
+        if success:
+            # Like `nmcli dev wifi connect`, a successful connect saves a profile
+            self.profiles[ssid] = password
+        return success, message
+
+    async def scan(self, rescan: bool = False) -> list[ScannedNetwork]:
+        await self._simulate("scan", "rescan" if rescan else "cached")
+        return [
+            ScannedNetwork(
+                ssid=n.ssid,
+                bssid=n.bssid,
+                signal=n.signal,
+                security=n.security,
+                channel=n.channel,
+                in_use=n.ssid == self.ssid,
+            )
+            for n in self.networks
+        ]
+
+    async def list_profiles(self) -> list[WifiProfile]:
+        await self._simulate("list_profiles")
+        return [
+            WifiProfile(name=ssid, ssid=ssid, active=ssid == self.ssid)
+            for ssid in self.profiles
+        ]
+
+    async def add_profile(self, ssid: str, password: str) -> tuple[bool, str]:
+        await self._simulate("add_profile", ssid)
+        self.profiles[ssid] = password
+        return True, f"Saved profile for {ssid}"
+
+    async def remove_profile(self, name: str) -> tuple[bool, str]:
+        await self._simulate("remove_profile", name)
+        if self.profiles.pop(name, None) is None:
+            return False, f"unknown connection '{name}'."
+        return True, f"Removed profile {name}"
+
+    async def activate_profile(self, name: str) -> tuple[bool, str]:
+        await self._simulate("activate_profile", name)
+        if name not in self.profiles:
+            return False, f"unknown connection '{name}'."
+        return self._join(name, self.profiles[name])
+
+    async def close(self) -> None:
+        self.closed = True
@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import re
+import string
+
+from server.backends.base import ScannedNetwork, WifiBackend, WifiProfile
+from server.utils.subprocess_runner import run_sudo_command_async
+
+NM_WIFI_TYPE = "802-11-wireless"
+
+# `nmcli dev wifi connect` reports the connection it activated by UUID
+ACTIVATED_UUID = re.compile(r"activated with '([0-9a-fA-F-]{36})'")
+
+
+def parse_active_ssid(stdout: str) -> str | None:
+    """Parse `nmcli -t -f active,ssid dev wifi` output"""
+    for line in stdout.strip().split("\n"):
+        if line.startswith("yes:"):
+            return line.split(":", 1)[1]
+    return None
+
+
+def parse_regulatory_country(stdout: str) -> str | None:
+    """Parse `iw reg get` output"""
+    for line in stdout.split("\n"):
+        if "country" in line.lower():
+            parts = line.split()
+            if len(parts) >= 2:
+                return parts[1].rstrip(":")
+    return None
+
+
+def split_terse_fields(line: str) -> list[str]:
+    """Split an `nmcli -t` line on unescaped colons, removing the escapes"""
+    fields: list[str] = []
+    current: list[str] = []
+    escaped = False
+    for char in line:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == ":":
+            fields.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    fields.append("".join(current))
+    return fields
+
+
+def parse_scan_line(line: str) -> ScannedNetwork | None:
+    """Parse one line of `nmcli -t -f IN-USE,SSID,BSSID,SIGNAL,SECURITY,CHAN dev wifi list`"""
+    fields = split_terse_fields(line)
+    if len(fields) != 6:
+        return None
+    in_use, ssid, bssid, signal, security, channel = fields
+    return ScannedNetwork(
+        ssid=ssid,
+        bssid=bssid,
+        signal=int(signal) if signal.isdigit() else 0,
+        security=security,
+        channel=int(channel) if channel.isdigit() else None,
+        in_use=in_use.strip() == "*",
+    )
+
+
+def parse_profile_line(line: str) -> tuple[str, bool] | None:
+    """Parse one line of `nmcli -t -f NAME,TYPE,ACTIVE connection show`, WiFi only"""
+    fields = split_terse_fields(line)
+    if len(fields) != 3 or fields[1] != NM_WIFI_TYPE:
+        return None
+    return fields[0], fields[2] == "yes"
+
+
+def wpa_psk(ssid: str, passphrase: str) -> str:
+    """
+    Derive the 64 hex digit WPA pre-shared key for a passphrase.
+
+    Storing the derived key rather than the passphrase saves wpa_supplicant
+    the 4096-round PBKDF2 on every activation. A passphrase that already is
+    64 hex digits is used as the key.
+
+    Raises:
+        ValueError: if the passphrase is not 8 to 63 characters
+    """
+    if len(passphrase) == 64 and all(c in string.hexdigits for c in passphrase):
+        return passphrase.lower()
+    if not 8 <= len(passphrase) <= 63:
+        raise ValueError("WPA passphrase must be 8 to 63 characters")
+    return hashlib.pbkdf2_hmac(
+        "sha1", passphrase.encode(), ssid.encode(), 4096, 32
+    ).hex()
+
+
+class NmcliWifiBackend(WifiBackend):
+    """Backend that shells out to `sudo nmcli` and `sudo iw` for every call"""
+
+    name = "nmcli"
+
+    async def get_active_ssid(self) -> str | None:
+        result = await run_sudo_command_async(
+            ["nmcli", "-t", "-f", "active,ssid", "dev", "wifi"]
+        )
+        if not result.success:
+            return None
+        return parse_active_ssid(result.stdout)
+
+    async def get_country(self) -> str | None:
+        result = await run_sudo_command_async(["iw", "reg", "get"])
+        if not result.success:
+            return None
+        return parse_regulatory_country(result.stdout)
+
+    async def set_country(self, country: str) -> tuple[bool, str]:
+        result = await run_sudo_command_async(["iw", "reg", "set", country.upper()])
+        if result.success:
+            return True, f"Country set to {country.upper()}"
+        return False, result.stderr
+
+    async def connect(
+        self, ssid: str, password: str, bssid: str | None = None
+    ) -> tuple[bool, str]:
+        args = ["nmcli", "dev", "wifi", "connect", ssid, "password", password]
+        if bssid is not None:
+            args += ["bssid", bssid]
+        result = await run_sudo_command_async(args, timeout=60)
+        if not result.success:
+            return False, result.stderr
+        activated = ACTIVATED_UUID.search(result.stdout)
+        if bssid is not None and activated is not None:
+            # nmcli saves the BSSID in the profile; drop it so the profile can
+            # still join another access point for the network later. Already
+            # connected, so a failure here is not an error.
+            await run_sudo_command_async(
+                [
+                    "nmcli",
+                    "connection",
+                    "modify",
+                    "uuid",
+                    activated.group(1),
+                    f"{NM_WIFI_TYPE}.bssid",
+                    "",
+                ]
+            )
+        return True, f"Connected to {ssid}"
+
+    async def scan(self, rescan: bool = False) -> list[ScannedNetwork]:
+        result = await run_sudo_command_async(
+            [
+                "nmcli",
+                "-t",
+                "-f",
+                "IN-USE,SSID,BSSID,SIGNAL,SECURITY,CHAN",
+                "dev",
+                "wifi",
+                "list",
+                "--rescan",
+                "yes" if rescan else "no",
+            ],
+            timeout=30,
+        )
+        if not result.success:
+            raise RuntimeError(result.stderr or "WiFi scan failed")
+        networks = []
+        for line in result.stdout.splitlines():
+            network = parse_scan_line(line)
+            if network is not None:
+                networks.append(network)
+        return networks
+
+    async def _profile_ssid(self, name: str) -> str:
+        result = await run_sudo_command_async(
+            ["nmcli", "-g", f"{NM_WIFI_TYPE}.ssid", "connection", "show", "id", name]
+        )
+        ssid = result.stdout.strip()
+        return ssid if result.success and ssid else name
+
+    async def _profile_names(self) -> dict[str, bool]:
+        result = await run_sudo_command_async(
+            ["nmcli", "-t", "-f", "NAME,TYPE,ACTIVE", "connection", "show"]
+        )
+        if not result.success:
+            raise RuntimeError(result.stderr or "Listing connections failed")
+        profiles = {}
+        for line in result.stdout.splitlines():
+            parsed = parse_profile_line(line)
+            if parsed is not None:
+                profiles[parsed[0]] = parsed[1]
+        return profiles
+
+    async def list_profiles(self) -> list[WifiProfile]:
+        profiles = await self._profile_names()
+        ssids = await asyncio.gather(*(self._profile_ssid(name) for name in profiles))
+        return [
+            WifiProfile(name=name, ssid=ssid, active=active)
+            for (name, active), ssid in zip(profiles.items(), ssids)
+        ]
+
+    async def add_profile(self, ssid: str, password: str) -> tuple[bool, str]:
+        security: list[str] = []
+        if password:
+            try:
+                psk = await asyncio.to_thread(wpa_psk, ssid, password)
+            except ValueError as e:
+                return False, str(e)
+            security = ["wifi-sec.key-mgmt", "wpa-psk", "wifi-sec.psk", psk]
+
+        try:
+            existing = ssid in await self._profile_names()
+        except RuntimeError as e:
+            return False, str(e)
+        if existing:
+            args = ["nmcli", "connection", "modify", "id", ssid, "wifi.ssid", ssid]
+            args += security or ["remove", "802-11-wireless-security"]
+        else:
+            args = ["nmcli", "connection", "add", "type", "wifi"]
+            args += ["con-name", ssid, "ssid", ssid, *security]
+        result = await run_sudo_command_async(args)
+        if result.success:
+            return True, f"Saved profile for {ssid}"
+        return False, result.stderr
+
+    async def remove_profile(self, name: str) -> tuple[bool, str]:
+        result = await run_sudo_command_async(
+            ["nmcli", "connection", "delete", "id", name]
+        )
+        if result.success:
+            return True, f"Removed profile {name}"
+        return False, result.stderr
+
+    async def activate_profile(self, name: str) -> tuple[bool, str]:
+        result = await run_sudo_command_async(
+            ["nmcli", "connection", "up", "id", name], timeout=60
+        )
+        if result.success:
+            return True, f"Connected to {name}"
+        return False, result.stderr
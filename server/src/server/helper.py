@@ -0,0 +1,256 @@
+"""Privileged helper: runs an allowlisted set of root commands over a Unix socket.
+
+Started once by systemd as root (`server helper`), so the unprivileged API
+server no longer pays for a sudo fork/exec and PAM session per command.
+Each connection sends newline-delimited JSON requests
+
+    {"args": [...], "timeout": 30, "input": null, "stream": false}
+
+and receives `{"line": {...}}` messages (when streaming) followed by one
+`{"result": {...}}` message per request.
+"""
+
+import asyncio
+import grp
+import os
+import re
+from typing import Any, Callable, List, Sequence
+
+from server.utils.paths import CONFIGURE_ASL_SCRIPT
+from server.utils.privileged import (
+    MAX_MESSAGE_BYTES,
+    decode_message,
+    encode_message,
+    result_to_message,
+)
+from server.utils.subprocess_runner import (
+    CommandResult,
+    run_command_async,
+    stream_command_async,
+)
+from server.utils.values import CALLSIGN, NODE_NUMBER, PASSWORD
+
+# systemd units the server may restart
+KNOWN_UNITS = {"allmon3", "allmon3.service", "display_driver.service"}
+
+# Longest timeout a client may ask for
+MAX_TIMEOUT = 300
+
+COUNTRY_CODE = re.compile(r"^[A-Z]{2}$")
+
+# Every nmcli command line the server runs (see backends/nmcli.py), by
+# argument; None stands for a name, SSID, password, key or UUID. Nothing
+# else is allowed, in particular not `-s` to show stored secrets.
+NMCLI_COMMANDS: list[Sequence[str | None]] = [
+    ["-t", "-f", "active,ssid", "dev", "wifi"],
+    ["-t", "-f", "IN-USE,SSID,BSSID,SIGNAL,SECURITY,CHAN", "dev", "wifi", "list"]
+    + ["--rescan", "yes"],
+    ["-t", "-f", "IN-USE,SSID,BSSID,SIGNAL,SECURITY,CHAN", "dev", "wifi", "list"]
+    + ["--rescan", "no"],
+    ["dev", "wifi", "connect", None, "password", None],
+    ["dev", "wifi", "connect", None, "password", None, "bssid", None],
+    ["-t", "-f", "NAME,TYPE,ACTIVE", "connection", "show"],
+    ["-g", "802-11-wireless.ssid", "connection", "show", "id", None],
+    ["connection", "add", "type", "wifi", "con-name", None, "ssid", None],
+    ["connection", "add", "type", "wifi", "con-name", None, "ssid", None]
+    + ["wifi-sec.key-mgmt", "wpa-psk", "wifi-sec.psk", None],
+    ["connection", "modify", "id", None, "wifi.ssid", None]
+    + ["wifi-sec.key-mgmt", "wpa-psk", "wifi-sec.psk", None],
+    ["connection", "modify", "id", None, "wifi.ssid", None]
+    + ["remove", "802-11-wireless-security"],
+    ["connection", "modify", "uuid", None, "802-11-wireless.bssid", ""],
+    ["connection", "delete", "id", None],
+    ["connection", "up", "id", None],
+]
+
+# nmcli connection subcommands that change a saved connection, allowed
+# only on WiFi ones; NM_WIFI_TYPE in backends/nmcli.py
+NMCLI_CONNECTION_CHANGES = ("modify", "delete", "up")
+NMCLI_WIFI_TYPE = "802-11-wireless"
+
+
+def _matches(args: List[str], shape: Sequence[str | None]) -> bool:
+    return len(args) == len(shape) and all(
+        expected is None or arg == expected for arg, expected in zip(args, shape)
+    )
+
+
+def _allow_nmcli(args: List[str]) -> bool:
+    return any(_matches(args, shape) for shape in NMCLI_COMMANDS)
+
+
+def _allow_iw(args: List[str]) -> bool:
+    return args == ["reg", "get"] or (
+        len(args) == 3
+        and args[:2] == ["reg", "set"]
+        and bool(COUNTRY_CODE.match(args[2]))
+    )
+
+
+def _allow_systemctl(args: List[str]) -> bool:
+    return (
+        len(args) >= 2
+        and args[0] == "restart"
+        and all(option == "--no-block" for option in args[1:-1])
+        and args[-1] in KNOWN_UNITS
+    )
+
+
+def _allow_chpasswd(args: List[str]) -> bool:
+    return args == []
+
+
+def _allow_chpasswd_input(input_text: str | None) -> bool:
+    # Exactly one line, and only ever for the rln user
+    if input_text is None or not input_text.startswith("rln:"):
+        return False
+    password, newline, rest = input_text[len("rln:") :].partition("\n")
+    return (
+        bool(newline)
+        and not rest
+        and bool(password)
+        and PASSWORD.fullmatch(password) is not None
+    )
+
+
+def _allow_allmon3_passwd(args: List[str]) -> bool:
+    return len(args) == 3 and args[0] == "--password" and args[2] == "rln"
+
+
+def _allow_configure_asl3(args: List[str]) -> bool:
+    return (
+        len(args) == 6
+        and args[0::2] == ["-n", "-c", "-p"]
+        and NODE_NUMBER.fullmatch(args[1]) is not None
+        and CALLSIGN.fullmatch(args[3]) is not None
+        and PASSWORD.fullmatch(args[5]) is not None
+    )
+
+
+# Executable -> check on its arguments. Anything else is refused.
+ALLOWED_COMMANDS: dict[str, Callable[[List[str]], bool]] = {
+    "nmcli": _allow_nmcli,
+    "iw": _allow_iw,
+    "systemctl": _allow_systemctl,
+    "chpasswd": _allow_chpasswd,
+    "allmon3-passwd": _allow_allmon3_passwd,
+    CONFIGURE_ASL_SCRIPT: _allow_configure_asl3,
+}
+
+# Executable -> check on its standard input. Commands not listed take none.
+ALLOWED_INPUT: dict[str, Callable[[str | None], bool]] = {
+    "chpasswd": _allow_chpasswd_input,
+}
+
+
+def is_allowed(args: List[str], input_text: Any = None) -> bool:
+    """Whether `args`, given `input_text` on stdin, may be run as root"""
+    if not args or not all(isinstance(arg, str) for arg in args):
+        return False
+    if input_text is not None and not isinstance(input_text, str):
+        return False
+    check = ALLOWED_COMMANDS.get(args[0])
+    if check is None or not check(args[1:]):
+        return False
+    check_input = ALLOWED_INPUT.get(args[0])
+    if check_input is None:
+        return input_text is None
+    return check_input(input_text)
+
+
+async def changes_only_wifi(args: List[str]) -> bool:
+    """Whether an allowed command leaves all but WiFi connections alone
+
+    The connection named by `id` or `uuid` in an nmcli modify, delete or
+    up must exist and be WiFi; every connection of that name, since nmcli
+    acts on all of them.
+    """
+    if args[:2] != ["nmcli", "connection"] or args[2] not in NMCLI_CONNECTION_CHANGES:
+        return True
+    result = await run_command_async(
+        ["nmcli", "-g", "connection.type", "connection", "show", args[3], args[4]],
+        timeout=10,
+    )
+    types = result.stdout.split()
+    return (
+        result.success
+        and bool(types)
+        and all(connection_type == NMCLI_WIFI_TYPE for connection_type in types)
+    )
+
+
+async def handle_request(
+    request: dict[str, Any], writer: asyncio.StreamWriter
+) -> CommandResult:
+    args = request.get("args")
+    input_text = request.get("input")
+    if (
+        not isinstance(args, list)
+        or not is_allowed(args, input_text)
+        or not await changes_only_wifi(args)
+    ):
+        return CommandResult(
+            success=False,
+            stdout="",
+            stderr=f"Operation not permitted by privileged helper: {args!r}",
+            return_code=-1,
+        )
+    timeout = min(int(request.get("timeout") or 30), MAX_TIMEOUT)
+
+    if not request.get("stream"):
+        return await run_command_async(args, timeout=timeout, input_text=input_text)
+
+    async with stream_command_async(
+        args, timeout=timeout, input_text=input_text
+    ) as stream:
+        async for line in stream:
+            writer.write(
+                encode_message({"line": {"stream": line.stream, "text": line.text}})
+            )
+            await writer.drain()
+    assert stream.result is not None
+    return stream.result
+
+
+async def handle_connection(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    try:
+        while line := await reader.readline():
+            try:
+                request = decode_message(line)
+            except ValueError as e:
+                result = CommandResult(
+                    success=False,
+                    stdout="",
+                    stderr=f"Malformed request: {e}",
+                    return_code=-1,
+                )
+            else:
+                result = await handle_request(request, writer)
+            writer.write(encode_message(result_to_message(result)))
+            await writer.drain()
+    except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_helper(path: str, group: str | None = None) -> None:
+    """Listen on `path` until cancelled; only root and `group` may connect"""
+    if os.path.exists(path):
+        os.unlink(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Nobody else may connect in the moment before the chown/chmod below
+    umask = os.umask(0o177)
+    try:
+        server = await asyncio.start_unix_server(
+            handle_connection, path, limit=MAX_MESSAGE_BYTES
+        )
+    finally:
+        os.umask(umask)
+    gid = grp.getgrnam(group).gr_gid if group is not None else -1
+    os.chown(path, -1, gid)
+    os.chmod(path, 0o660)
+    async with server:
+        await server.serve_forever()
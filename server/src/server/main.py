@@ -1,40 +1,49 @@
 import json
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from typer import Typer
-import uvicorn
 
-from .routes.wifi import router as wifi_router
-from .routes.favourites import router as favourites_router
-from .routes.asl import router as asl_router
-from .routes.configuration import router as configuration_router
+# Subcommands import the app, uvicorn and the backends themselves, so that
+# `server --help` and `server export-schema` only load what they use
 
 cli = Typer()
 
 
-def build_app(serve: bool):
-    app = FastAPI(title="RNL-Z2 Configuration API")
-
-    app.include_router(wifi_router)
-    app.include_router(favourites_router)
-    app.include_router(asl_router)
-    app.include_router(configuration_router)
-
-    if serve:
-        app.mount(
-            "/", StaticFiles(packages=[("server", "build")], html=True), name="spa"
-        )
-
-    return app
-
-
 @cli.command()
-def serve(port: int = 8080):
+def serve(
+    port: int = 8080,
+    max_commands: int | None = None,
+    wifi_backend: str | None = None,
+    privileged_socket: str | None = None,
+):
+    import uvicorn
+
+    from .app import build_app
+    from .backends import create_wifi_backend, set_wifi_backend
+    from .utils.privileged import set_privileged_socket
+    from .utils.subprocess_runner import set_max_concurrent_commands
+
+    if privileged_socket is not None:
+        set_privileged_socket(privileged_socket)
+    if wifi_backend is not None:
+        set_wifi_backend(create_wifi_backend(wifi_backend))
+    if max_commands is not None:
+        set_max_concurrent_commands(max_commands)
     uvicorn.run(host="0.0.0.0", app=build_app(serve=True), port=port)
 
 
 @cli.command()
 def export_schema():
+    from .app import build_app
+
     app = build_app(serve=False)
     schema = app.openapi()
     print(json.dumps(schema))
+
+
+@cli.command()
+def helper(socket: str = "/run/rln/helper.sock", group: str | None = None):
+    """Run the privileged helper (as root) for `serve --privileged-socket`"""
+    import asyncio
+
+    from .helper import serve_helper
+
+    asyncio.run(serve_helper(socket, group))
@@ -1,11 +1,42 @@
+import asyncio
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Collection
+
 import fastapi
 from pydantic import BaseModel, field_validator
 
+from server.routes.favourites import (
+    display_restart_pending,
+    read_node_number_from_file,
+    save_node_number,
+)
 from server.routes.wifi import custom_generate_unique_id
-from server.utils.subprocess_runner import run_sudo_command
-
+from server.utils.applied import (
+    ALREADY_APPLIED,
+    fingerprint,
+    forget_applied,
+    is_applied,
+    record_applied,
+)
+from server.utils.dag import DagStep, StepOutcome, run_dag
+from server.utils.deadline import deadline_scope
+from server.utils.journal import COMPLETED_BEFORE_RESTART, SECRETS_NOT_KEPT
+from server.utils.resources import ASL_RESOURCE, resource_coordinator
+from server.utils.paths import CONFIGURE_ASL_SCRIPT
+from server.utils.restarts import restart_scheduler
+from server.utils.subprocess_runner import (
+    OutputLine,
+    run_sudo_command_async,
+    run_sudo_command_streaming,
+)
+from server.utils.values import CALLSIGN, NODE_NUMBER, PASSWORD
 
-CONFIGURE_ASL_SCRIPT = "/home/rln/configure-asl3.sh"
+# Asterisk config written by configure-asl3.sh; the node stanza in rpt.conf
+# carries the node number and, in its ID recording, the callsign
+RPT_CONF_PATH = Path(os.environ.get("RLN_ASL_RPT_CONF", "/etc/asterisk/rpt.conf"))
 
 
 class ASLConfig(BaseModel):
@@ -20,6 +51,28 @@ class ASLConfig(BaseModel):
     def trim_whitespace(cls, v: str) -> str:
         return v.strip()
 
+    # The privileged helper refuses anything else; see utils/values.py
+    @field_validator('node_number')
+    @classmethod
+    def check_node_number(cls, v: str) -> str:
+        if not NODE_NUMBER.fullmatch(v):
+            raise ValueError("Node number must be 1 to 9 digits")
+        return v
+
+    @field_validator('callsign')
+    @classmethod
+    def check_callsign(cls, v: str) -> str:
+        if not CALLSIGN.fullmatch(v):
+            raise ValueError("Callsign must be letters and digits, with an optional /suffix")
+        return v
+
+    @field_validator('node_password', 'login_password')
+    @classmethod
+    def check_password(cls, v: str) -> str:
+        if not PASSWORD.fullmatch(v):
+            raise ValueError("Password must not contain control characters")
+        return v
+
 
 class ASLStatus(BaseModel):
     node_number: str | None = None
@@ -30,6 +83,7 @@ class ASLResult(BaseModel):
     success: bool
     message: str
     error: str | None = None
+    timings: dict[str, float] = {}
 
 
 router = fastapi.APIRouter(
@@ -37,36 +91,108 @@ router = fastapi.APIRouter(
 )
 
 
-def configure_asl3(node_number: str, callsign: str, password: str) -> tuple[bool, str]:
-    """Run configure-asl3.sh script"""
-    result = run_sudo_command(
-        [CONFIGURE_ASL_SCRIPT, "-n", node_number, "-c", callsign, "-p", password],
-        timeout=60,
-    )
+@dataclass
+class RptConfSnapshot:
+    """Parsed rpt.conf, tagged with the stat result it was read under"""
+
+    path: Path
+    key: tuple[int, int, int]
+    status: ASLStatus
+
+
+_rpt_conf: RptConfSnapshot | None = None
+
+NODE_SECTION = re.compile(r"^\[(\d+)\]")
+ID_SETTING = re.compile(r"^(idrecording|idtalkover)\s*=>?\s*(.*)$")
+
+
+def parse_rpt_conf(text: str) -> ASLStatus:
+    """Node number and callsign from the first node stanza of rpt.conf
+
+    The callsign comes from a Morse ID setting such as `idrecording = |iG1LRO`;
+    ID recordings that play a sound file carry no callsign.
+    """
+    node_number = None
+    callsign = None
+    in_node = False
+    for raw in text.splitlines():
+        line = raw.split(";", 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith("["):
+            if in_node:
+                break
+            match = NODE_SECTION.match(line)
+            if match:
+                node_number = match.group(1)
+                in_node = True
+            continue
+        if not in_node:
+            continue
+        match = ID_SETTING.match(line)
+        if match and match.group(2).startswith("|i") and callsign is None:
+            callsign = match.group(2)[2:].strip().upper() or None
+    return ASLStatus(node_number=node_number, callsign=callsign)
+
+
+def read_asl_status() -> ASLStatus:
+    """Return the configured ASL node, re-parsing rpt.conf only when it changed"""
+    global _rpt_conf
+    path = RPT_CONF_PATH
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ASLStatus()
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if _rpt_conf is not None and _rpt_conf.path == path and _rpt_conf.key == key:
+        return _rpt_conf.status.model_copy()
+
+    try:
+        text = path.read_text(errors="replace")
+    except OSError:
+        return ASLStatus()
+    _rpt_conf = RptConfSnapshot(path=path, key=key, status=parse_rpt_conf(text))
+    return _rpt_conf.status.model_copy()
+
+
+async def configure_asl3(
+    node_number: str,
+    callsign: str,
+    password: str,
+    on_line: Callable[[OutputLine], None] | None = None,
+) -> tuple[bool, str]:
+    """Run configure-asl3.sh script, passing its output lines to `on_line`"""
+    args = [CONFIGURE_ASL_SCRIPT, "-n", node_number, "-c", callsign, "-p", password]
+    if on_line is None:
+        result = await run_sudo_command_async(args, timeout=60)
+    else:
+        result = await run_sudo_command_streaming(args, on_line, timeout=60)
     if result.success:
         return True, "ASL3 configured"
     return False, result.stderr or result.stdout
 
 
-def set_allmon3_password(password: str) -> tuple[bool, str]:
+async def set_allmon3_password(password: str) -> tuple[bool, str]:
     """Set allmon3 password for rln user"""
-    result = run_sudo_command(["allmon3-passwd", "--password", password, "rln"])
+    result = await run_sudo_command_async(
+        ["allmon3-passwd", "--password", password, "rln"]
+    )
     if result.success:
         return True, "Allmon3 password set"
     return False, result.stderr
 
 
-def restart_allmon3() -> tuple[bool, str]:
-    """Restart allmon3 service"""
-    result = run_sudo_command(["systemctl", "restart", "allmon3"])
-    if result.success:
+async def restart_allmon3() -> tuple[bool, str]:
+    """Restart allmon3 service, coalesced with other pending restarts"""
+    success, message = await restart_scheduler.request_restart("allmon3")
+    if success:
         return True, "Allmon3 restarted"
-    return False, result.stderr
+    return False, message
 
 
-def set_rln_user_password(password: str) -> tuple[bool, str]:
+async def set_rln_user_password(password: str) -> tuple[bool, str]:
     """Set rln user system password using chpasswd"""
-    result = run_sudo_command(
+    result = await run_sudo_command_async(
         ["chpasswd"],
         input_text=f"rln:{password}\n",
     )
@@ -75,51 +201,194 @@ def set_rln_user_password(password: str) -> tuple[bool, str]:
     return False, result.stderr
 
 
-@router.get("")
-def get_asl_status() -> ASLStatus:
-    """Get current ASL status (passwords not returned)"""
-    # We don't have a reliable way to read current config
-    # Return empty status - frontend will show empty fields
-    return ASLStatus()
+async def update_favourites_node_number(node_number: str) -> tuple[bool, str]:
+    """Write the node number into the favourites file"""
+    try:
+        changed = await save_node_number(node_number)
+    except Exception as e:
+        return False, str(e)
+    if not changed:
+        return True, "Node number unchanged"
+    return True, "Node number written to favourites"
 
 
-@router.post("")
-def set_asl(config: ASLConfig) -> ASLResult:
-    """Configure ASL: run configure script, restart services, set passwords
-    
-    NOTE: Asterisk restart is handled by display_driver.service, not here.
+# Error prefix for each ASL apply step, keyed by step name
+ASL_STEP_LABELS = {
+    "configure_asl3": "configure-asl3",
+    "allmon3_password": "allmon3 password",
+    "allmon3_restart": "allmon3 restart",
+    "user_password": "user password",
+    "favourites_node_number": "favourites node number",
+}
+
+
+def asl_fingerprints(config: ASLConfig) -> dict[str, str]:
+    """Fingerprint of the inputs of each ASL step whose effect is remembered"""
+    return {
+        "configure_asl3": fingerprint(
+            config.node_number, config.callsign, secrets=(config.node_password,)
+        ),
+        "allmon3_password": fingerprint(secrets=(config.login_password,)),
+        "user_password": fingerprint(secrets=(config.login_password,)),
+    }
+
+
+def build_asl_steps(
+    config: ASLConfig,
+    update_favourites: bool = False,
+    on_output: Callable[[str, OutputLine], None] | None = None,
+    applied: Collection[str] = (),
+) -> list[DagStep]:
+    """Declare the ASL apply steps and the ordering constraints between them
+
+    Steps named in `applied` are already in effect and are skipped, as is
+    the allmon3 restart when nothing it depends on changes.
     """
-    errors = []
 
-    # Step 1: Run configure-asl3.sh
-    success, msg = configure_asl3(
-        config.node_number, config.callsign, config.node_password
-    )
-    if not success:
-        errors.append(f"configure-asl3: {msg}")
+    def relay_configure_output(line: OutputLine) -> None:
+        if on_output is not None:
+            on_output("configure_asl3", line)
+
+    steps = [
+        DagStep(
+            "configure_asl3",
+            lambda: configure_asl3(
+                config.node_number,
+                config.callsign,
+                config.node_password,
+                relay_configure_output if on_output is not None else None,
+            ),
+        ),
+        DagStep(
+            "allmon3_password", lambda: set_allmon3_password(config.login_password)
+        ),
+        # allmon3 reads the node config and its password file on restart
+        DagStep(
+            "allmon3_restart",
+            restart_allmon3,
+            after=("configure_asl3", "allmon3_password"),
+        ),
+        DagStep("user_password", lambda: set_rln_user_password(config.login_password)),
+    ]
+    if update_favourites:
+        steps.append(
+            DagStep(
+                "favourites_node_number",
+                lambda: update_favourites_node_number(config.node_number),
+            )
+        )
+
+    restart_needed = not {"configure_asl3", "allmon3_password"} <= set(applied)
+    for step in steps:
+        if step.name in applied:
+            step.skip = ALREADY_APPLIED
+        elif step.name == "allmon3_restart" and not restart_needed:
+            step.skip = "Nothing changed that needs a restart"
+    return steps
 
-    # REMOVED: Step 2 - Restart asterisk (display_driver.py handles this)
 
-    # Step 3: Set allmon3 password
-    success, msg = set_allmon3_password(config.login_password)
-    if not success:
-        errors.append(f"allmon3 password: {msg}")
+async def _secrets_not_kept() -> tuple[bool, str]:
+    return False, SECRETS_NOT_KEPT
 
-    # Step 4: Restart allmon3
-    success, msg = restart_allmon3()
-    if not success:
-        errors.append(f"allmon3 restart: {msg}")
 
-    # Step 5: Set rln user password
-    success, msg = set_rln_user_password(config.login_password)
-    if not success:
-        errors.append(f"user password: {msg}")
+async def apply_asl(
+    config: ASLConfig,
+    update_favourites: bool = False,
+    on_start: Callable[[str], None] | None = None,
+    on_finish: Callable[[StepOutcome], None] | None = None,
+    on_output: Callable[[str, OutputLine], None] | None = None,
+    force: bool = False,
+    completed: Collection[str] = (),
+    unavailable: Collection[str] = (),
+) -> tuple[list[str], dict[str, StepOutcome]]:
+    """Run the ASL apply steps, independent ones concurrently
+
+    Steps whose inputs match the last successful apply are skipped unless
+    `force` is set. Steps in `completed` already ran in an interrupted
+    attempt at this same apply and are skipped too; steps in `unavailable`
+    lost their password with that attempt and fail. `on_output` receives
+    (step name, line) for output from steps that stream it, currently
+    configure-asl3.sh.
+
+    Returns:
+        Error messages in step declaration order, and each step's outcome
+    """
+    # scrypt keeps secrets out of the snapshot but is CPU-bound
+    fingerprints = await asyncio.to_thread(asl_fingerprints, config)
+    applied: set[str] = set()
+    if not force:
+        applied = {
+            name
+            for name, digest in fingerprints.items()
+            if is_applied(f"asl.{name}", digest)
+        }
+        # Not in effect until the display has restarted to show it
+        if (
+            update_favourites
+            and read_node_number_from_file() == config.node_number
+            and not display_restart_pending()
+        ):
+            applied.add("favourites_node_number")
+    # Not applied by an earlier apply but by this one, before the restart;
+    # allmon3 still needs restarting if their restart did not happen
+    applied -= set(completed)
+
+    steps = build_asl_steps(config, update_favourites, on_output, applied)
+    for step in steps:
+        if step.name in completed:
+            step.skip = COMPLETED_BEFORE_RESTART
+        elif step.name in unavailable:
+            step.run = _secrets_not_kept
+    outcomes = await run_dag(steps, on_start, on_finish)
+    for name, digest in fingerprints.items():
+        outcome = outcomes[name]
+        if outcome.skipped:
+            continue
+        if outcome.success:
+            record_applied(f"asl.{name}", digest)
+        else:
+            # Partly applied at best; make sure the next apply runs it
+            forget_applied(f"asl.{name}")
+    errors = [
+        f"{ASL_STEP_LABELS[name]}: {outcome.message}"
+        for name, outcome in outcomes.items()
+        if not outcome.success
+    ]
+    return errors, outcomes
+
+
+@router.get("")
+async def get_asl_status() -> ASLStatus:
+    """Get current ASL status (passwords not returned)
+
+    Node number and callsign are read from rpt.conf; both are None if it
+    is missing or unreadable.
+    """
+    return read_asl_status()
+
+
+@router.post("")
+async def set_asl(config: ASLConfig) -> ASLResult:
+    """Configure ASL: run configure script, restart services, set passwords
+    
+    NOTE: Asterisk restart is handled by display_driver.service, not here.
+    Requests queued behind a running apply collapse into the latest one.
+    The whole apply runs under the default request deadline.
+    """
+    with deadline_scope():
+        errors, outcomes = await resource_coordinator.submit(
+            ASL_RESOURCE, lambda: apply_asl(config), key="apply"
+        )
+    timings = {name: outcome.elapsed for name, outcome in outcomes.items()}
 
     if not errors:
-        return ASLResult(success=True, message="ASL configured successfully")
+        return ASLResult(
+            success=True, message="ASL configured successfully", timings=timings
+        )
     else:
         return ASLResult(
             success=False,
             message="ASL configuration had errors",
             error="; ".join(errors),
+            timings=timings,
         )
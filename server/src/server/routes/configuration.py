@@ -1,30 +1,77 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Collection, Literal
+
 import fastapi
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 
 from server.routes.wifi import (
+    WIFI_CONNECTION_KEY,
     custom_generate_unique_id,
     WiFiConfig,
     WiFiStatus,
+    country_in_effect,
     get_current_wifi_status,
+    wifi_connection_fingerprint,
     set_regulatory_country,
     connect_to_wifi,
 )
 from server.routes.favourites import (
+    DEFAULT_FAVOURITES,
+    FavouriteItem,
     FavouritesConfig,
     read_favourites_file,
-    write_favourites_file,
-    write_node_number_to_favourites_file,
+    read_node_number_from_file,
+    save_favourites,
     restart_display_service,
+    display_restart_pending,
+    owe_display_restart,
 )
 from server.routes.asl import (
+    ASL_STEP_LABELS,
     ASLConfig,
     ASLStatus,
-    configure_asl3,
-    set_allmon3_password,
-    restart_allmon3,
-    set_rln_user_password,
+    apply_asl,
+    read_asl_status,
+)
+from server.utils.applied import (
+    ALREADY_APPLIED,
+    forget_applied,
+    is_applied,
+    record_applied,
+)
+from server.utils.dag import StepOutcome
+from server.utils.resources import ASL_RESOURCE, WIFI_RESOURCE, resource_coordinator
+from server.utils.deadline import (
+    DEADLINE_EXCEEDED,
+    MAX_REQUEST_TIMEOUT,
+    deadline_expired,
+    deadline_scope,
+)
+from server.utils.jobs import Job, JobStatus, StepStatus, job_manager
+from server.utils.journal import (
+    COMPLETED_BEFORE_RESTART,
+    SECRETS_NOT_KEPT,
+    UnfinishedJob,
+    apply_journal,
+)
+
+# Seconds GET /api/configuration waits for the section readers before
+# answering with stale or default values for the ones still running
+CONFIGURATION_READ_DEADLINE = float(
+    os.environ.get("RLN_CONFIGURATION_READ_DEADLINE", "3")
 )
-from server.utils.subprocess_runner import run_sudo_command
+
+# Request fields blanked in the apply journal, and the steps that cannot
+# be resumed without them
+JOURNAL_SECRETS: dict[tuple[str, str], tuple[str, ...]] = {
+    ("wifi", "password"): ("wifi",),
+    ("asl", "node_password"): ("asl.configure_asl3",),
+    ("asl", "login_password"): ("asl.allmon3_password", "asl.user_password"),
+}
 
 
 router = fastapi.APIRouter(
@@ -39,12 +86,21 @@ class SectionResult(BaseModel):
     success: bool
     message: str
     error: str | None = None
+    # Steps not run because their desired state was already in effect
+    skipped: list[str] = Field(default_factory=list)
+
+
+class SectionRead(BaseModel):
+    status: Literal["ok", "stale", "timeout", "error"]
+    elapsed_ms: float
+    error: str | None = None
 
 
 class ConfigurationResponse(BaseModel):
     favourites: FavouritesConfig
     wifi: WiFiStatus
     asl: ASLStatus
+    sections: dict[str, SectionRead] = Field(default_factory=dict)
 
 
 class ConfigurationRequest(BaseModel):
@@ -54,6 +110,11 @@ class ConfigurationRequest(BaseModel):
     favourites: FavouritesConfig | None = None
     wifi: WiFiConfig | None = None
     asl: ASLConfig | None = None
+    # Run every step even if the last apply already put it in effect
+    force: bool = False
+    # Seconds the whole apply may take, RLN_REQUEST_TIMEOUT if unset. Steps
+    # still running when it passes time out; later ones are skipped.
+    timeout: float | None = Field(default=None, gt=0, le=MAX_REQUEST_TIMEOUT)
 
 
 class ConfigurationUpdateResponse(BaseModel):
@@ -61,37 +122,290 @@ class ConfigurationUpdateResponse(BaseModel):
     results: dict[str, SectionResult]
 
 
-def restart_display_service_helper() -> tuple[bool, str]:
+class JobStep(BaseModel):
+    name: str
+    status: StepStatus
+    message: str = ""
+    error: str | None = None
+    elapsed: float | None = None
+
+
+class ConfigurationJob(BaseModel):
+    job_id: str
+    status: JobStatus
+    steps: list[JobStep]
+    result: ConfigurationUpdateResponse | None = None
+    error: str | None = None
+
+
+def job_to_model(job: Job) -> ConfigurationJob:
+    return ConfigurationJob(
+        job_id=job.id,
+        status=job.status,
+        steps=[JobStep(**step.to_dict()) for step in job.steps.values()],
+        result=job.result,
+        error=job.error,
+    )
+
+
+async def restart_display_service_helper() -> tuple[bool, str]:
     """Helper to restart display service and return tuple"""
-    result = run_sudo_command(["systemctl", "restart", "display_driver.service"])
-    if result.success:
+    success, message = await restart_display_service()
+    if success:
         return True, "Display service restarted"
-    return False, result.stderr
+    return False, message
+
+
+async def read_favourites_section() -> FavouritesConfig:
+    return await asyncio.to_thread(read_favourites_file)
+
+
+async def read_asl_section() -> ASLStatus:
+    return await asyncio.to_thread(read_asl_status)
+
+
+SECTION_READERS: dict[str, Callable[[], Awaitable[Any]]] = {
+    "favourites": read_favourites_section,
+    "wifi": get_current_wifi_status,
+    "asl": read_asl_section,
+}
+
+SECTION_DEFAULTS: dict[str, Callable[[], Any]] = {
+    "favourites": lambda: FavouritesConfig(
+        items=[FavouriteItem(**f) for f in DEFAULT_FAVOURITES]
+    ),
+    "wifi": lambda: WiFiStatus(connected=False),
+    "asl": ASLStatus,
+}
+
+# Last successfully read value of each section, served when a reader is late
+_last_section_values: dict[str, Any] = {}
+
+
+async def read_sections(
+    deadline: float,
+) -> tuple[dict[str, Any], dict[str, SectionRead]]:
+    """Run every section reader concurrently, waiting at most `deadline` seconds.
+
+    Sections that miss the deadline or fail fall back to their last good
+    value (status "stale") or to a default (status "timeout"/"error").
+    """
+    started = time.perf_counter()
+    finished: dict[str, float] = {}
+    tasks: dict[str, asyncio.Task[Any]] = {}
+    for name, reader in SECTION_READERS.items():
+        task = asyncio.ensure_future(reader())
+        task.add_done_callback(
+            lambda _, name=name: finished.setdefault(name, time.perf_counter())
+        )
+        tasks[name] = task
+
+    await asyncio.wait(tasks.values(), timeout=deadline)
+
+    values: dict[str, Any] = {}
+    reads: dict[str, SectionRead] = {}
+    for name, task in tasks.items():
+        elapsed_ms = (finished.get(name, time.perf_counter()) - started) * 1000
+        if task.done() and not task.cancelled() and task.exception() is None:
+            values[name] = _last_section_values[name] = task.result()
+            reads[name] = SectionRead(status="ok", elapsed_ms=elapsed_ms)
+            continue
+
+        if task.done():
+            error = str(task.exception()) if not task.cancelled() else "cancelled"
+            status: Literal["timeout", "error"] = "error"
+        else:
+            task.cancel()
+            error = f"Timed out after {deadline} seconds"
+            status = "timeout"
+
+        if name in _last_section_values:
+            values[name] = _last_section_values[name]
+            reads[name] = SectionRead(
+                status="stale", elapsed_ms=elapsed_ms, error=error
+            )
+        else:
+            values[name] = SECTION_DEFAULTS[name]()
+            reads[name] = SectionRead(status=status, elapsed_ms=elapsed_ms, error=error)
+
+    return values, reads
 
 
 @router.get("")
-def get_configuration() -> ConfigurationResponse:
-    """Get current configuration (passwords returned as empty)"""
+async def get_configuration(response: fastapi.Response) -> ConfigurationResponse:
+    """Get current configuration (passwords returned as empty)
+
+    Sections are read concurrently under a shared deadline; `sections`
+    reports how each read went and how long it took.
+    """
+    values, reads = await read_sections(CONFIGURATION_READ_DEADLINE)
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={read.elapsed_ms:.1f}" for name, read in reads.items()
+    )
     return ConfigurationResponse(
-        favourites=read_favourites_file(),
-        wifi=get_current_wifi_status(),
-        asl=ASLStatus(),  # No way to read current ASL config
+        favourites=values["favourites"],
+        wifi=values["wifi"],
+        asl=values["asl"],
+        sections=reads,
     )
 
 
-@router.post("")
-def update_configuration(request: ConfigurationRequest) -> ConfigurationUpdateResponse:
-    """Update selected configuration sections
+def plan_configuration_steps(request: ConfigurationRequest) -> list[str]:
+    """Steps apply_configuration will report on, in execution order"""
+    steps = [
+        name
+        for name, enabled in (
+            ("favourites", request.update_favourites),
+            ("wifi", request.update_wifi),
+            ("asl", request.update_asl),
+        )
+        if enabled
+    ]
+    if request.update_asl:
+        steps[steps.index("asl") + 1 : steps.index("asl") + 1] = [
+            f"asl.{name}" for name in ASL_STEP_LABELS
+        ]
+    if steps:
+        steps.append("display")
+    return steps
+
+
+def _finish_section(job: Job, name: str, result: SectionResult) -> None:
+    if not result.success and deadline_expired():
+        job.time_out_step(name, DEADLINE_EXCEEDED, result.error)
+    else:
+        job.finish_step(name, result.success, result.message, result.error)
+
+
+def _skip_for_deadline(job: Job, name: str, results: dict[str, SectionResult]) -> bool:
+    """Skip section `name`, and its steps, if the request deadline has passed"""
+    if not deadline_expired():
+        return False
+    for step in list(job.steps):
+        if step == name or step.startswith(f"{name}."):
+            job.skip_step(step, DEADLINE_EXCEEDED)
+    results[name] = SectionResult(success=False, message=DEADLINE_EXCEEDED)
+    return True
+
+
+def _finish_asl_step(job: Job, outcome: StepOutcome) -> None:
+    if outcome.timed_out:
+        job.time_out_step(f"asl.{outcome.name}", DEADLINE_EXCEEDED, outcome.message)
+    elif outcome.skipped:
+        job.skip_step(f"asl.{outcome.name}", outcome.message)
+    elif outcome.success:
+        job.finish_step(f"asl.{outcome.name}", True, outcome.message)
+    else:
+        job.finish_step(f"asl.{outcome.name}", False, "Failed", outcome.message)
+
+
+async def apply_wifi_section(
+    wifi: WiFiConfig, force: bool
+) -> tuple[SectionResult, bool]:
+    """Set the country and connect, skipping whatever is already in effect
+
+    Returns:
+        The section result, and whether the display needs a restart
+    """
+    errors = []
+    skipped = []
+    needs_display_restart = False
+
+    # Set country code
+    if not force and await country_in_effect(wifi.country):
+        skipped.append("country")
+    else:
+        country_success, country_msg = await set_regulatory_country(wifi.country)
+        if not country_success:
+            errors.append(f"Country: {country_msg}")
+
+    # Connect to WiFi, unless already on this network with this password
+    connection = await asyncio.to_thread(
+        wifi_connection_fingerprint, wifi.ssid, wifi.password
+    )
+    status = await get_current_wifi_status()
+    if (
+        not force
+        and status.ssid == wifi.ssid
+        and is_applied(WIFI_CONNECTION_KEY, connection)
+    ):
+        skipped.append("connection")
+        wifi_success = True
+    else:
+        wifi_success, wifi_msg = await connect_to_wifi(wifi.ssid, wifi.password)
+        if wifi_success:
+            record_applied(WIFI_CONNECTION_KEY, connection)
+        else:
+            forget_applied(WIFI_CONNECTION_KEY)
+            errors.append(f"Connection: {wifi_msg}")
+
+    if len(skipped) == 2:
+        result = SectionResult(
+            success=True,
+            message=f"{ALREADY_APPLIED}: connected to {wifi.ssid}",
+            skipped=skipped,
+        )
+    elif wifi_success:
+        # Don't restart display here - we'll do it once at the end
+        needs_display_restart = True
+        result = SectionResult(
+            success=True,
+            message=f"Wi-Fi restarting – wait for IP to be displayed on the RLN Z2. Connected to {wifi.ssid}",
+            skipped=skipped,
+        )
+    else:
+        needs_display_restart = True
+        result = SectionResult(
+            success=False,
+            message="Failed",
+            error="; ".join(errors),
+            skipped=skipped,
+        )
+    return result, needs_display_restart
+
+
+async def apply_configuration(
+    request: ConfigurationRequest,
+    job: Job,
+    completed: dict[str, tuple[str, str]] | None = None,
+    unavailable: Collection[str] = (),
+) -> ConfigurationUpdateResponse:
+    """Apply selected configuration sections, reporting progress on `job`
     
     NOTE: Asterisk restart is handled by display_driver.service when it restarts.
     We don't restart asterisk directly to avoid conflicts.
+
+    `completed` maps steps that finished before the server restarted to
+    their (status, message); a resumed job does not run them again. Steps
+    in `unavailable` need a password the journal did not keep, and fail.
     """
     results: dict[str, SectionResult] = {}
     overall_success = True
-    needs_display_restart = False
+    # A display restart an earlier apply skipped or failed is still owed
+    needs_display_restart = display_restart_pending()
+    completed = completed or {}
+
+    for name in ("favourites", "wifi", "asl"):
+        if name in completed:
+            job.skip_step(name, COMPLETED_BEFORE_RESTART)
+            results[name] = SectionResult(success=True, message=completed[name][1])
+            # Whether it changed anything is not recorded, so assume it did
+            needs_display_restart = True
+        elif name in unavailable:
+            job.finish_step(name, False, "Failed", SECRETS_NOT_KEPT)
+            results[name] = SectionResult(
+                success=False, message="Failed", error=SECRETS_NOT_KEPT
+            )
+            # It may have been part way through when the server restarted
+            needs_display_restart = True
 
     # Update favourites if requested
-    if request.update_favourites:
+    if (
+        request.update_favourites
+        and "favourites" not in results
+        and not _skip_for_deadline(job, "favourites", results)
+    ):
+        job.start_step("favourites")
         if request.favourites is None:
             results["favourites"] = SectionResult(
                 success=False, message="No favourites data provided"
@@ -101,118 +415,250 @@ def update_configuration(request: ConfigurationRequest) -> ConfigurationUpdateRe
             try:
                 # If ASL is also being updated, use the new node number
                 node_number = request.asl.node_number if request.update_asl and request.asl else None
-                write_favourites_file(request.favourites, node_number)
-                # Don't restart display here - we'll do it once at the end
-                needs_display_restart = True
-                results["favourites"] = SectionResult(
-                    success=True, message="Favourites updated"
-                )
+                if await save_favourites(request.favourites, node_number):
+                    # Don't restart display here - we'll do it once at the end
+                    needs_display_restart = True
+                    results["favourites"] = SectionResult(
+                        success=True, message="Favourites updated"
+                    )
+                else:
+                    results["favourites"] = SectionResult(
+                        success=True, message="Favourites unchanged"
+                    )
             except Exception as e:
                 results["favourites"] = SectionResult(
                     success=False, message="Failed", error=str(e)
                 )
                 overall_success = False
+        _finish_section(job, "favourites", results["favourites"])
 
     # Update WiFi if requested
-    if request.update_wifi:
+    if (
+        request.update_wifi
+        and "wifi" not in results
+        and not _skip_for_deadline(job, "wifi", results)
+    ):
+        job.start_step("wifi")
         if request.wifi is None:
             results["wifi"] = SectionResult(
                 success=False, message="No WiFi data provided"
             )
             overall_success = False
         else:
-            errors = []
-
-            # Set country code
-            country_success, country_msg = set_regulatory_country(request.wifi.country)
-            if not country_success:
-                errors.append(f"Country: {country_msg}")
-
-            # Connect to WiFi
-            wifi_success, wifi_msg = connect_to_wifi(
-                request.wifi.ssid, request.wifi.password
+            # Waits for any WiFi change in progress; queued applies collapse
+            wifi = request.wifi
+            results["wifi"], restart = await resource_coordinator.submit(
+                WIFI_RESOURCE,
+                lambda: apply_wifi_section(wifi, request.force),
+                key="configuration",
             )
-            if not wifi_success:
-                errors.append(f"Connection: {wifi_msg}")
-
-            # Don't restart display here - we'll do it once at the end
-            needs_display_restart = True
-
-            if wifi_success:
-                results["wifi"] = SectionResult(
-                    success=True, 
-                    message=f"Wi-Fi restarting – wait for IP to be displayed on the RLN Z2. Connected to {request.wifi.ssid}"
-                )
-            else:
-                results["wifi"] = SectionResult(
-                    success=False, message="Failed", error="; ".join(errors)
-                )
-                overall_success = False
+            needs_display_restart = needs_display_restart or restart
+            overall_success = overall_success and results["wifi"].success
+        _finish_section(job, "wifi", results["wifi"])
 
     # Update ASL if requested
-    if request.update_asl:
+    if (
+        request.update_asl
+        and "asl" not in results
+        and not _skip_for_deadline(job, "asl", results)
+    ):
+        job.start_step("asl")
         if request.asl is None:
             results["asl"] = SectionResult(
                 success=False, message="No ASL data provided"
             )
             overall_success = False
         else:
-            errors = []
-
-            # Step 1: Run configure-asl3.sh
-            success, msg = configure_asl3(
-                request.asl.node_number,
-                request.asl.callsign,
-                request.asl.node_password,
+            node_number_changed = (
+                read_node_number_from_file() != request.asl.node_number
             )
-            if not success:
-                errors.append(f"configure-asl3: {msg}")
-
-            # REMOVED: Asterisk restart - display_driver.py handles this
-
-            # Step 2: Set allmon3 password
-            success, msg = set_allmon3_password(request.asl.login_password)
-            if not success:
-                errors.append(f"allmon3 password: {msg}")
-
-            # Step 3: Restart allmon3
-            success, msg = restart_allmon3()
-            if not success:
-                errors.append(f"allmon3: {msg}")
-
-            # Step 4: Set rln user password
-            success, msg = set_rln_user_password(request.asl.login_password)
-            if not success:
-                errors.append(f"user password: {msg}")
-
-            # Step 5: Write node number to favourites file
-            try:
-                write_node_number_to_favourites_file(request.asl.node_number)
+            asl = request.asl
+            # Independent steps run concurrently; see build_asl_steps. If a
+            # newer job's ASL apply replaces this one while queued, its
+            # outcome is reported here and its progress on the newer job.
+            errors, outcomes = await resource_coordinator.submit(
+                ASL_RESOURCE,
+                lambda: apply_asl(
+                    asl,
+                    update_favourites=True,
+                    on_start=lambda name: job.start_step(f"asl.{name}"),
+                    on_finish=lambda outcome: _finish_asl_step(job, outcome),
+                    on_output=lambda name, line: job.output(
+                        f"asl.{name}", line.stream, line.text
+                    ),
+                    force=request.force,
+                    completed=[
+                        name.removeprefix("asl.")
+                        for name in completed
+                        if name.startswith("asl.")
+                    ],
+                    unavailable=[
+                        name.removeprefix("asl.")
+                        for name in unavailable
+                        if name.startswith("asl.")
+                    ],
+                ),
+                key="configuration",
+            )
+            for name in ASL_STEP_LABELS:
+                step = job.steps.get(f"asl.{name}")
+                if step is not None and step.status == "pending":
+                    job.skip_step(step.name, "Superseded by a newer request")
+            if outcomes["favourites_node_number"].success and node_number_changed:
                 needs_display_restart = True
-            except Exception as e:
-                errors.append(f"favourites node number: {str(e)}")
 
-            if not errors:
+            skipped = [
+                name
+                for name, outcome in outcomes.items()
+                if outcome.skipped and outcome.success
+            ]
+            if not errors and len(skipped) == len(outcomes):
                 results["asl"] = SectionResult(
-                    success=True, message="ASL configured successfully"
+                    success=True, message=ALREADY_APPLIED, skipped=skipped
+                )
+            elif not errors:
+                results["asl"] = SectionResult(
+                    success=True, message="ASL configured successfully", skipped=skipped
                 )
             else:
                 results["asl"] = SectionResult(
                     success=False,
                     message="ASL configuration had errors",
                     error="; ".join(errors),
+                    skipped=skipped,
                 )
                 overall_success = False
+        _finish_section(job, "asl", results["asl"])
+
+    # Sections skipped for the deadline count as failures
+    overall_success = overall_success and all(
+        result.success for result in results.values()
+    )
 
     # FIXED: Restart display service once at the end if needed
     # Display driver will handle asterisk restart, so no waiting needed
-    if needs_display_restart:
-        display_success, display_msg = restart_display_service_helper()
-        if not display_success:
+    if needs_display_restart and "display" not in completed:
+        # Owed until a restart succeeds, in case this one is skipped or fails
+        owe_display_restart()
+    if "display" in completed:
+        job.skip_step("display", COMPLETED_BEFORE_RESTART)
+    elif needs_display_restart and deadline_expired():
+        job.skip_step("display", DEADLINE_EXCEEDED)
+    elif needs_display_restart:
+        job.start_step("display")
+        display_success, display_msg = await restart_display_service_helper()
+        if display_success:
+            job.finish_step("display", True, display_msg)
+        elif deadline_expired():
+            job.time_out_step("display", DEADLINE_EXCEEDED, display_msg)
+        else:
+            job.finish_step("display", False, "Display restart failed", display_msg)
             # Add warning to results but don't fail the whole operation
             if "wifi" in results:
                 results["wifi"].message += f" (Display restart warning: {display_msg})"
             elif "favourites" in results:
                 results["favourites"].message += f" (Display restart warning: {display_msg})"
+    elif "display" in job.steps:
+        job.skip_step("display", "No changes need a display restart")
 
     return ConfigurationUpdateResponse(success=overall_success, results=results)
+
+
+@router.post("", status_code=202)
+async def update_configuration(request: ConfigurationRequest) -> ConfigurationJob:
+    """Start applying selected configuration sections in the background
+
+    Returns straight away with a job id. Poll /api/configuration/jobs/{job_id}
+    or follow /api/configuration/jobs/{job_id}/events for progress.
+    """
+    return job_to_model(start_configuration_job(request))
+
+
+def journal_payload(request: ConfigurationRequest) -> dict[str, Any]:
+    """`request` as journalled: JOURNAL_SECRETS blanked, and which were set"""
+    data = request.model_dump(mode="json")
+    redacted = []
+    for section, name in JOURNAL_SECRETS:
+        if data.get(section) and data[section][name]:
+            data[section][name] = ""
+            redacted.append(f"{section}.{name}")
+    return {"request": data, "redacted": redacted}
+
+
+def start_configuration_job(
+    request: ConfigurationRequest,
+    resumed: UnfinishedJob | None = None,
+    unavailable: Collection[str] = (),
+) -> Job:
+    """Submit a configuration job, journalled so a restart can resume it
+
+    A `resumed` job keeps its id and skips the steps it completed before;
+    the steps in `unavailable` lost their password and fail.
+    """
+    completed = resumed.completed if resumed is not None else {}
+    # The job's task, and every command it runs, inherits the deadline
+    with deadline_scope(request.timeout):
+        job = job_manager.submit(
+            "configuration",
+            lambda job: apply_configuration(request, job, completed, unavailable),
+            steps=plan_configuration_steps(request),
+            job_id=resumed.id if resumed is not None else None,
+        )
+    apply_journal.track(job, journal_payload(request), resumed=resumed is not None)
+    return job
+
+
+def resume_configuration_jobs() -> list[Job]:
+    """Resume configuration jobs the last run of the server left unfinished"""
+    jobs = []
+    for entry in apply_journal.unfinished("configuration"):
+        try:
+            request = ConfigurationRequest.model_validate(entry.payload["request"])
+            redacted = set(entry.payload["redacted"])
+        except (ValidationError, KeyError, TypeError):
+            continue
+        unavailable = {
+            step
+            for (section, name), steps in JOURNAL_SECRETS.items()
+            if f"{section}.{name}" in redacted
+            for step in steps
+        }
+        jobs.append(start_configuration_job(request, entry, unavailable))
+    if not jobs:
+        apply_journal.clear()
+    return jobs
+
+
+def _get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None or job.kind != "configuration":
+        raise fastapi.HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def get_configuration_job(job_id: str) -> ConfigurationJob:
+    """Get progress and, once finished, the result of a configuration job"""
+    return job_to_model(_get_job_or_404(job_id))
+
+
+@router.get(
+    "/jobs/{job_id}/events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_configuration_job(
+    job_id: str, last_event_id: str | None = fastapi.Header(default=None)
+) -> StreamingResponse:
+    """Stream configuration job progress as Server-Sent Events"""
+    job = _get_job_or_404(job_id)
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def events():
+        async for event in job.stream(after):
+            data = event.data
+            if event.type == "job":
+                data = job_to_model(job).model_dump(mode="json")
+            yield f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
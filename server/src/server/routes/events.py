@@ -0,0 +1,205 @@
+import asyncio
+import math
+import os
+from typing import Any, Awaitable, Callable
+
+import fastapi
+from fastapi import WebSocket
+
+from server.routes.health import StateSnapshot, state_poller
+from server.routes.wifi import invalidate_wifi_status
+
+# Seconds to wait after a NetworkManager event for the burst that usually
+# follows it, before state is read again
+NM_EVENT_DEBOUNCE = float(os.environ.get("RLN_NM_EVENT_DEBOUNCE", "0.5"))
+
+# Shortest gap in seconds between event-triggered state reads; events in
+# between, such as the stream a reconnect produces, share the next read
+NM_EVENT_MIN_INTERVAL = float(os.environ.get("RLN_NM_EVENT_MIN_INTERVAL", "5"))
+
+# Seconds before `nmcli monitor` is started again after it exits
+NM_MONITOR_RETRY = float(os.environ.get("RLN_NM_MONITOR_RETRY", "10"))
+
+# Messages queued per WebSocket client; a client that falls this far behind
+# is sent a fresh snapshot instead
+EVENT_QUEUE_SIZE = 32
+
+
+router = fastapi.APIRouter()
+
+
+def snapshot_sections(snapshot: StateSnapshot) -> dict[str, Any]:
+    return {
+        "wifi": (
+            snapshot.wifi.model_dump(mode="json") if snapshot.wifi is not None else None
+        ),
+        "services": dict(snapshot.services),
+    }
+
+
+class StateHub:
+    """
+    Latest known state, by section, and the clients following it.
+
+    Each subscriber first gets a "snapshot" message with every section, then
+    a "delta" message with only the sections that changed, whenever one does.
+    """
+
+    def __init__(self) -> None:
+        self.state: dict[str, Any] = {}
+        self._subscribers: set[asyncio.Queue[dict[str, Any]]] = set()
+
+    def update(self, sections: dict[str, Any]) -> None:
+        changes = {
+            name: value
+            for name, value in sections.items()
+            if name not in self.state or self.state[name] != value
+        }
+        if not changes:
+            return
+        self.state.update(changes)
+        for queue in self._subscribers:
+            if queue.full():
+                # Replace the backlog with one message carrying everything
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._snapshot_message())
+            else:
+                queue.put_nowait({"type": "delta", "changes": changes})
+
+    def publish_snapshot(self, snapshot: StateSnapshot) -> None:
+        self.update(snapshot_sections(snapshot))
+
+    def _snapshot_message(self) -> dict[str, Any]:
+        return {"type": "snapshot", "state": dict(self.state)}
+
+    def subscribe(self) -> asyncio.Queue[dict[str, Any]]:
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(EVENT_QUEUE_SIZE)
+        queue.put_nowait(self._snapshot_message())
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[dict[str, Any]]) -> None:
+        self._subscribers.discard(queue)
+
+
+state_hub = StateHub()
+state_poller.listeners.append(state_hub.publish_snapshot)
+
+
+class NetworkMonitor:
+    """
+    Follow `nmcli monitor` and call `on_change` after NetworkManager events.
+
+    A burst of events within `debounce` seconds triggers one call, and
+    calls are at least `min_interval` seconds apart: events that arrive
+    sooner, or while a call runs, are folded into one call when the gap is
+    up. nmcli is started once and kept running; if it exits it is restarted
+    after `retry` seconds.
+    """
+
+    def __init__(
+        self,
+        on_change: Callable[[], Awaitable[Any]],
+        debounce: float = NM_EVENT_DEBOUNCE,
+        retry: float = NM_MONITOR_RETRY,
+        min_interval: float = NM_EVENT_MIN_INTERVAL,
+    ):
+        self.on_change = on_change
+        self.debounce = debounce
+        self.retry = retry
+        self.min_interval = min_interval
+        self._task: asyncio.Task[None] | None = None
+        self._pending: asyncio.Task[None] | None = None
+        # An event arrived that no refresh has started to cover yet
+        self._dirty = False
+        self._last_refresh = -math.inf
+
+    def _changed(self) -> None:
+        self._dirty = True
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.ensure_future(self._refresh())
+
+    async def _refresh(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._dirty:
+            await asyncio.sleep(
+                max(self.debounce, self._last_refresh + self.min_interval - loop.time())
+            )
+            # Events from here on need another refresh
+            self._dirty = False
+            self._last_refresh = loop.time()
+            invalidate_wifi_status()
+            await self.on_change()
+
+    async def _follow(self) -> None:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "nmcli",
+                "monitor",
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError:
+            return
+        assert process.stdout is not None
+        try:
+            while await process.stdout.readline():
+                self._changed()
+            await process.wait()
+        except ValueError:
+            pass
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    async def _run(self) -> None:
+        while True:
+            await self._follow()
+            await asyncio.sleep(self.retry)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._pending):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._pending = None
+
+
+network_monitor = NetworkMonitor(state_poller.poll)
+
+
+@router.websocket("/api/events")
+async def state_events(websocket: WebSocket) -> None:
+    """Push state to the client: a "snapshot" message, then "delta" messages"""
+    await websocket.accept()
+    queue = state_hub.subscribe()
+
+    async def send() -> None:
+        while True:
+            await websocket.send_json(await queue.get())
+
+    async def receive() -> None:
+        # Nothing is expected from the client; this notices it going away
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.ensure_future(send()), asyncio.ensure_future(receive())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        state_hub.unsubscribe(queue)
+        for task in tasks:
+            task.cancel()
+        # Either side failing just means the client has gone
+        await asyncio.gather(*tasks, return_exceptions=True)
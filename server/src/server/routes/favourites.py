@@ -1,15 +1,26 @@
+import asyncio
+import os
+from dataclasses import dataclass
 from pathlib import Path
 from typing import List
 import fastapi
 from pydantic import BaseModel
 
 from server.routes.wifi import custom_generate_unique_id
-from server.utils.subprocess_runner import run_sudo_command, CommandResult
+from server.utils.applied import forget_applied, is_applied, record_applied
+from server.utils.deadline import deadline_scope
+from server.utils.files import atomic_write_text
+from server.utils.resources import FAVOURITES_RESOURCE, resource_coordinator
+from server.utils.restarts import restart_scheduler
 
 
 FAVOURITES_PATH = Path("/home/rln/favourites.txt")
 DISPLAY_SERVICE = "display_driver.service"
 
+# Applied-state key held while a change the display only picks up when it
+# restarts is still waiting for that restart
+DISPLAY_RESTART_PENDING_KEY = "display.restart_pending"
+
 # Default favourites from spec - FIXED: Changed line 2 from Parrot to Freestar
 DEFAULT_FAVOURITES = [
     {"name": "Hubnet", "node_number": "41223"},
@@ -41,56 +52,45 @@ router = fastapi.APIRouter(
 )
 
 
-def read_node_number_from_file() -> str | None:
-    """Read the node number from the first line of the favourites file"""
-    if not FAVOURITES_PATH.exists():
-        return None
-    with open(FAVOURITES_PATH) as f:
-        first_line = f.readline().strip()
-        # First line should be just a node number (digits only)
-        if first_line and first_line.isdigit():
-            return first_line
-    return None
+@dataclass
+class FavouritesSnapshot:
+    """Parsed favourites file, tagged with the stat result it was read under"""
 
+    path: Path
+    key: tuple[int, int, int]
+    text: str
+    node_number: str | None
+    config: FavouritesConfig
 
-DEFAULT_NODE_NUMBER = "99999"
 
+_snapshot: FavouritesSnapshot | None = None
 
-def write_favourites_file(config: FavouritesConfig, node_number: str | None = None) -> None:
-    """Write favourites to file with node number as first line, then name,node_number per line.
-    If node_number not provided, reads existing one from file or defaults to 99999."""
-    if node_number is None:
-        node_number = read_node_number_from_file()
-    if node_number is None:
-        node_number = DEFAULT_NODE_NUMBER
 
-    with open(FAVOURITES_PATH, "w") as f:
-        f.write(f"{node_number}\n")
-        for item in config.items:
-            # FIXED: Trim whitespace from name and node_number
-            f.write(f"{item.name.strip()},{item.node_number.strip()}\n")
+def parse_node_number(text: str) -> str | None:
+    """Return the node number on the first line of favourites text, if any"""
+    first_line = text.split("\n", 1)[0].strip()
+    # First line should be just a node number (digits only)
+    if first_line and first_line.isdigit():
+        return first_line
+    return None
 
 
-def read_favourites_file() -> FavouritesConfig:
-    """Read favourites from file. First line is node number (skipped), rest are name,node_number"""
-    if not FAVOURITES_PATH.exists():
-        return FavouritesConfig(items=[FavouriteItem(**f) for f in DEFAULT_FAVOURITES])
-
+def parse_favourites(text: str) -> FavouritesConfig:
+    """Parse favourites text. First line is node number (skipped), rest are name,node_number"""
     items: List[FavouriteItem] = []
-    with open(FAVOURITES_PATH) as f:
-        lines = f.readlines()
-        # Skip first line if it's a node number (digits only)
-        start_idx = 0
-        if lines and lines[0].strip().isdigit():
-            start_idx = 1
-
-        for line in lines[start_idx:]:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = line.split(",")
-            if len(parts) == 2:
-                items.append(FavouriteItem(name=parts[0], node_number=parts[1]))
+    lines = text.splitlines()
+    # Skip first line if it's a node number (digits only)
+    start_idx = 0
+    if lines and lines[0].strip().isdigit():
+        start_idx = 1
+
+    for line in lines[start_idx:]:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(",")
+        if len(parts) == 2:
+            items.append(FavouriteItem(name=parts[0], node_number=parts[1]))
 
     # Pad with defaults if fewer than 6
     while len(items) < 6:
@@ -103,39 +103,154 @@ def read_favourites_file() -> FavouritesConfig:
     return FavouritesConfig(items=items[:6])  # Max 6 items
 
 
-def write_node_number_to_favourites_file(node_number: str) -> None:
-    """Update only the node number in the favourites file, preserving existing favourites"""
+def load_favourites_snapshot() -> FavouritesSnapshot | None:
+    """Return the parsed favourites file, re-reading it only when it changed on disk"""
+    global _snapshot
+    path = FAVOURITES_PATH
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if _snapshot is not None and _snapshot.path == path and _snapshot.key == key:
+        return _snapshot
+
+    text = path.read_text()
+    _snapshot = FavouritesSnapshot(
+        path=path,
+        key=key,
+        text=text,
+        node_number=parse_node_number(text),
+        config=parse_favourites(text),
+    )
+    return _snapshot
+
+
+def read_node_number_from_file() -> str | None:
+    """Read the node number from the first line of the favourites file"""
+    snapshot = load_favourites_snapshot()
+    return snapshot.node_number if snapshot is not None else None
+
+
+DEFAULT_NODE_NUMBER = "99999"
+
+
+def render_favourites(config: FavouritesConfig, node_number: str) -> str:
+    """Render favourites with node number as first line, then name,node_number per line"""
+    lines = [f"{node_number}\n"]
+    for item in config.items:
+        # FIXED: Trim whitespace from name and node_number
+        lines.append(f"{item.name.strip()},{item.node_number.strip()}\n")
+    return "".join(lines)
+
+
+def write_favourites_file(
+    config: FavouritesConfig, node_number: str | None = None
+) -> bool:
+    """Write favourites to file with node number as first line, then name,node_number per line.
+    If node_number not provided, reads existing one from file or defaults to 99999.
+
+    The file is replaced atomically, and left untouched if the content would
+    not change. Returns True if the file was written."""
+    global _snapshot
+    snapshot = load_favourites_snapshot()
+    if node_number is None and snapshot is not None:
+        node_number = snapshot.node_number
+    if node_number is None:
+        node_number = DEFAULT_NODE_NUMBER
+
+    text = render_favourites(config, node_number)
+    if snapshot is not None and snapshot.text == text:
+        return False
+
+    atomic_write_text(FAVOURITES_PATH, text)
+    _snapshot = None
+    return True
+
+
+def read_favourites_file() -> FavouritesConfig:
+    """Read favourites from file. First line is node number (skipped), rest are name,node_number"""
+    snapshot = load_favourites_snapshot()
+    if snapshot is None:
+        return FavouritesConfig(items=[FavouriteItem(**f) for f in DEFAULT_FAVOURITES])
+    return snapshot.config.model_copy(deep=True)
+
+
+def write_node_number_to_favourites_file(node_number: str) -> bool:
+    """Update only the node number in the favourites file, preserving existing favourites.
+    Returns True if the file was written."""
     existing_config = read_favourites_file()
-    write_favourites_file(existing_config, node_number)
+    return write_favourites_file(existing_config, node_number)
 
 
-def restart_display_service() -> CommandResult:
-    """Restart the display service"""
-    return run_sudo_command(["systemctl", "restart", DISPLAY_SERVICE])
+async def save_favourites(
+    config: FavouritesConfig, node_number: str | None = None
+) -> bool:
+    """Write the favourites file after any write in progress; queued writes
+    collapse into the latest one. Returns True if the file was written."""
+    return await resource_coordinator.submit(
+        FAVOURITES_RESOURCE,
+        lambda: asyncio.to_thread(write_favourites_file, config, node_number),
+        key="favourites",
+    )
+
+
+async def save_node_number(node_number: str) -> bool:
+    """Write the node number after any favourites write in progress; queued
+    writes collapse into the latest one. Returns True if the file was written."""
+    return await resource_coordinator.submit(
+        FAVOURITES_RESOURCE,
+        lambda: asyncio.to_thread(write_node_number_to_favourites_file, node_number),
+        key="node_number",
+    )
+
+
+def owe_display_restart() -> None:
+    """Remember the display needs restarting, until a restart succeeds"""
+    record_applied(DISPLAY_RESTART_PENDING_KEY, "pending")
+
+
+def display_restart_pending() -> bool:
+    """Whether a change is still waiting for the display to restart"""
+    return is_applied(DISPLAY_RESTART_PENDING_KEY, "pending")
+
+
+async def restart_display_service() -> tuple[bool, str]:
+    """Restart the display service, coalesced with other pending restarts"""
+    success, message = await restart_scheduler.request_restart(DISPLAY_SERVICE)
+    if success:
+        forget_applied(DISPLAY_RESTART_PENDING_KEY)
+    return success, message
 
 
 @router.get("")
-def get_favourites() -> FavouritesConfig:
+async def get_favourites() -> FavouritesConfig:
     """Get current favourites configuration"""
     return read_favourites_file()
 
 
 @router.post("")
-def set_favourites(config: FavouritesConfig) -> FavouritesResult:
-    """Save favourites and restart display service"""
-    try:
-        write_favourites_file(config)
-        result = restart_display_service()
-
-        if result.success:
-            return FavouritesResult(
-                success=True, message="Updated and display service restarted"
-            )
-        else:
+async def set_favourites(config: FavouritesConfig) -> FavouritesResult:
+    """Save favourites and restart display service if the file changed"""
+    with deadline_scope():
+        try:
+            if not await save_favourites(config):
+                return FavouritesResult(
+                    success=True, message="Favourites unchanged, display not restarted"
+                )
+            success, message = await restart_display_service()
+
+            if success:
+                return FavouritesResult(
+                    success=True, message="Updated and display service restarted"
+                )
+            else:
+                return FavouritesResult(
+                    success=False,
+                    message="File saved but service restart failed",
+                    error=message,
+                )
+        except Exception as e:
             return FavouritesResult(
-                success=False,
-                message="File saved but service restart failed",
-                error=result.stderr,
+                success=False, message="Failed to save", error=str(e)
             )
-    except Exception as e:
-        return FavouritesResult(success=False, message="Failed to save", error=str(e))
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Literal
+
+import fastapi
+from pydantic import BaseModel, Field
+
+from server.routes.wifi import WiFiStatus, custom_generate_unique_id, read_wifi_status
+from server.utils.subprocess_runner import run_command_async
+
+# Seconds between background refreshes of the state snapshot (0 disables)
+STATE_POLL_INTERVAL = float(os.environ.get("RLN_STATE_POLL_INTERVAL", "30"))
+
+# Snapshot age in seconds after which /readyz reports not ready
+STATE_STALE_AFTER = float(
+    os.environ.get("RLN_STATE_STALE_AFTER", str(3 * STATE_POLL_INTERVAL))
+)
+
+# systemd units whose state is polled, comma separated
+HEALTH_UNITS = [
+    unit.strip()
+    for unit in os.environ.get(
+        "RLN_HEALTH_UNITS", "display_driver.service,allmon3.service,asterisk.service"
+    ).split(",")
+    if unit.strip()
+]
+
+
+class HealthStatus(BaseModel):
+    status: Literal["ok", "starting", "stale", "error"]
+    # Seconds since the snapshot was taken, None before the first poll
+    age: float | None = None
+    wifi: WiFiStatus | None = None
+    services: dict[str, str] = Field(default_factory=dict)
+    error: str | None = None
+
+
+router = fastapi.APIRouter(generate_unique_id_function=custom_generate_unique_id)
+
+
+@dataclass
+class StateSnapshot:
+    """Box state as of the last background poll"""
+
+    taken_at: float
+    wifi: WiFiStatus | None = None
+    services: dict[str, str] = field(default_factory=dict)
+    error: str | None = None
+
+
+async def read_service_states(units: list[str]) -> dict[str, str]:
+    """Read every unit's state with a single `systemctl is-active` call"""
+    if not units:
+        return {}
+    # Exits non-zero when any unit is inactive; the states are still printed
+    result = await run_command_async(["systemctl", "is-active", *units])
+    states = result.stdout.split()
+    if len(states) != len(units):
+        raise RuntimeError(result.stderr or "systemctl is-active failed")
+    return dict(zip(units, states))
+
+
+class StatePoller:
+    """
+    Refresh WiFi, regulatory and service state every `interval` seconds.
+
+    Health endpoints answer from `snapshot` without running any commands.
+    A failed read keeps the previous value for that part of the snapshot
+    and records the error. `listeners` are called with every new snapshot;
+    poll() may also be called between scheduled polls when state is known
+    to have changed.
+    """
+
+    def __init__(self, interval: float = STATE_POLL_INTERVAL):
+        self.interval = interval
+        self.snapshot: StateSnapshot | None = None
+        self.listeners: list[Callable[[StateSnapshot], None]] = []
+        self._task: asyncio.Task[None] | None = None
+
+    async def poll(self) -> StateSnapshot:
+        wifi, services = await asyncio.gather(
+            read_wifi_status(),
+            read_service_states(HEALTH_UNITS),
+            return_exceptions=True,
+        )
+        previous = self.snapshot
+        snapshot = StateSnapshot(taken_at=time.monotonic())
+        errors = []
+        if isinstance(wifi, BaseException):
+            errors.append(f"wifi: {wifi}")
+            snapshot.wifi = previous.wifi if previous is not None else None
+        else:
+            snapshot.wifi = wifi
+        if isinstance(services, BaseException):
+            errors.append(f"services: {services}")
+            snapshot.services = previous.services if previous is not None else {}
+        else:
+            snapshot.services = services
+        snapshot.error = "; ".join(errors) or None
+        self.snapshot = snapshot
+        for listener in self.listeners:
+            listener(snapshot)
+        return snapshot
+
+    async def _run(self) -> None:
+        while True:
+            await self.poll()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+state_poller = StatePoller()
+
+
+def health_status(stale_after: float = STATE_STALE_AFTER) -> HealthStatus:
+    """Describe the current snapshot"""
+    snapshot = state_poller.snapshot
+    if snapshot is None:
+        return HealthStatus(status="starting")
+    age = time.monotonic() - snapshot.taken_at
+    status: Literal["ok", "stale", "error"] = "ok"
+    if age > stale_after:
+        status = "stale"
+    elif snapshot.error is not None:
+        status = "error"
+    return HealthStatus(
+        status=status,
+        age=age,
+        wifi=snapshot.wifi,
+        services=snapshot.services,
+        error=snapshot.error,
+    )
+
+
+@router.get("/healthz")
+async def healthz() -> HealthStatus:
+    """Liveness: the server is answering. Reports the last polled state."""
+    return health_status()
+
+
+@router.get("/readyz", responses={503: {"model": HealthStatus}})
+async def readyz(response: fastapi.Response) -> HealthStatus:
+    """Readiness: the polled state is fresh and was read without errors
+
+    Answered from the background snapshot; no commands are run.
+    """
+    health = health_status()
+    if health.status != "ok":
+        response.status_code = 503
+    return health
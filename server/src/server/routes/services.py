@@ -0,0 +1,29 @@
+import fastapi
+from pydantic import BaseModel
+
+from server.routes.wifi import custom_generate_unique_id
+from server.utils.restarts import restart_scheduler
+
+
+class RestartCounters(BaseModel):
+    requested: int
+    performed: int
+    avoided: int
+
+
+router = fastapi.APIRouter(
+    prefix="/api/services", generate_unique_id_function=custom_generate_unique_id
+)
+
+
+@router.get("/restarts")
+async def get_restart_stats() -> dict[str, RestartCounters]:
+    """Get per-unit restart counts, including restarts avoided by coalescing"""
+    return {
+        unit: RestartCounters(
+            requested=stats.requested,
+            performed=stats.performed,
+            avoided=stats.avoided,
+        )
+        for unit, stats in restart_scheduler.stats.items()
+    }
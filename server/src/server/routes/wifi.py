@@ -1,8 +1,19 @@
+import asyncio
+import os
+import time
+from typing import Literal
+
 import fastapi
 from fastapi.routing import APIRoute
 from pydantic import BaseModel, field_validator
 
-from server.utils.subprocess_runner import run_sudo_command
+from server.backends import ScannedNetwork, get_wifi_backend
+from server.utils.applied import fingerprint
+from server.utils.cache import AsyncTTLCache
+from server.utils.deadline import deadline_expired, deadline_scope, time_left
+from server.utils.metrics import wifi_connect_attempt_duration, wifi_switch_duration
+from server.utils.resources import WIFI_RESOURCE, resource_coordinator
+from server.utils.restarts import restart_scheduler
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -35,91 +46,362 @@ class WiFiStatus(BaseModel):
     country: str | None = None
 
 
+class WiFiNetwork(BaseModel):
+    ssid: str
+    bssid: str
+    signal: int
+    security: str
+    channel: int | None = None
+    in_use: bool = False
+
+
+class WiFiNetworkList(BaseModel):
+    networks: list[WiFiNetwork]
+    age: float
+
+
 class WiFiResult(BaseModel):
     success: bool
     message: str
     error: str | None = None
 
 
+class WiFiSwitchResult(WiFiResult):
+    elapsed: float
+
+
+class WiFiProfile(BaseModel):
+    name: str
+    ssid: str
+    active: bool = False
+
+
+class WiFiProfileList(BaseModel):
+    profiles: list[WiFiProfile]
+    age: float
+
+
+class WiFiProfileCreate(BaseModel):
+    ssid: str
+    password: str
+
+    @field_validator("ssid", "password")
+    @classmethod
+    def trim_whitespace(cls, v: str) -> str:
+        return v.strip()
+
+
 class ErrorResponse(BaseModel):
     detail: str
 
 
-def get_current_wifi_status() -> WiFiStatus:
-    """Get current WiFi connection status using nmcli"""
-    result = run_sudo_command(["nmcli", "-t", "-f", "active,ssid", "dev", "wifi"])
+# Seconds a WiFi status snapshot is served before the backend is asked again
+WIFI_STATUS_TTL = float(os.environ.get("RLN_WIFI_STATUS_TTL", "5"))
 
-    ssid = None
-    if result.success:
-        for line in result.stdout.strip().split("\n"):
-            if line.startswith("yes:"):
-                ssid = line.split(":", 1)[1]
-                break
-
-    # Get current regulatory country
-    country = None
-    reg_result = run_sudo_command(["iw", "reg", "get"])
-    if reg_result.success:
-        for line in reg_result.stdout.split("\n"):
-            if "country" in line.lower():
-                parts = line.split()
-                if len(parts) >= 2:
-                    country = parts[1].rstrip(":")
-                    break
 
+async def read_wifi_status() -> WiFiStatus:
+    """Read WiFi connection status from the WiFi backend, bypassing the cache"""
+    backend = get_wifi_backend()
+    # SSID and regulatory country are independent, so read them side by side
+    ssid, country = await asyncio.gather(
+        backend.get_active_ssid(), backend.get_country()
+    )
     return WiFiStatus(connected=ssid is not None, ssid=ssid, country=country)
 
 
-def set_regulatory_country(country: str) -> tuple[bool, str]:
+wifi_status_cache: AsyncTTLCache[WiFiStatus] = AsyncTTLCache(
+    read_wifi_status, ttl=WIFI_STATUS_TTL
+)
+
+
+async def get_current_wifi_status() -> WiFiStatus:
+    """Get current WiFi connection status, served from a short-lived cache"""
+    return await wifi_status_cache.get()
+
+
+def invalidate_wifi_status() -> None:
+    """Force the next status read to go to the WiFi backend"""
+    wifi_status_cache.invalidate()
+
+
+# Applied-state key for the network last connected to successfully
+WIFI_CONNECTION_KEY = "wifi.connection"
+
+
+def wifi_connection_fingerprint(ssid: str, password: str) -> str:
+    return fingerprint(ssid, secrets=(password,))
+
+
+async def country_in_effect(country: str) -> bool:
+    """Whether the regulatory domain is already `country`"""
+    status = await get_current_wifi_status()
+    return (status.country or "").upper() == country.upper()
+
+
+async def set_regulatory_country(country: str) -> tuple[bool, str]:
     """Set WiFi regulatory country code"""
-    result = run_sudo_command(["iw", "reg", "set", country.upper()])
-    if result.success:
-        return True, f"Country set to {country.upper()}"
-    return False, result.stderr
+    try:
+        return await get_wifi_backend().set_country(country)
+    finally:
+        invalidate_wifi_status()
+
+
+# Attempts connect_to_wifi makes before reporting a failure
+WIFI_CONNECT_ATTEMPTS = int(os.environ.get("RLN_WIFI_CONNECT_ATTEMPTS", "3"))
+
+# Seconds before the first retry, doubled for each one after it
+WIFI_CONNECT_BACKOFF = float(os.environ.get("RLN_WIFI_CONNECT_BACKOFF", "1"))
+WIFI_CONNECT_BACKOFF_MAX = 8.0
+
+# NetworkManager error text (lower case) meaning the password was refused
+WIFI_AUTH_FAILURES = ("secrets were required", "no secrets", "psk: property is invalid")
+
+# NetworkManager error text (lower case) meaning the network was not seen
+WIFI_NOT_FOUND_FAILURES = ("no network with ssid", "no access point with bssid")
+
+ConnectFailure = Literal["auth", "not_found", "transient"]
+
+
+def classify_connect_failure(message: str) -> ConnectFailure:
+    """Why a connect attempt failed, judged from the backend's message"""
+    message = message.lower()
+    if any(text in message for text in WIFI_AUTH_FAILURES):
+        return "auth"
+    if any(text in message for text in WIFI_NOT_FOUND_FAILURES):
+        return "not_found"
+    return "transient"
+
+
+async def find_access_point(ssid: str) -> WiFiNetwork | None:
+    """Strongest access point for `ssid` in the cached scan, if it is there
+
+    A failed scan finds nothing, so the connect goes ahead unpinned.
+    """
+    try:
+        networks = await wifi_scan_cache.get()
+    except Exception:
+        return None
+    for network in networks:
+        if network.ssid == ssid:
+            return network
+    return None
+
+
+async def connect_to_wifi(ssid: str, password: str) -> tuple[bool, str]:
+    """Connect to WiFi network using the WiFi backend
+
+    Each attempt pins the access point found for `ssid` in the cached scan,
+    so NetworkManager does not scan again. Failures are retried with
+    backoff, up to WIFI_CONNECT_ATTEMPTS: a refused password is not retried,
+    and a network missing from the scan makes the next attempt rescan first.
+    """
+    backend = get_wifi_backend()
+    started = time.monotonic()
+    success, message = False, "No connection attempts allowed"
+    backoff = WIFI_CONNECT_BACKOFF
+    try:
+        for attempt in range(1, WIFI_CONNECT_ATTEMPTS + 1):
+            target = await find_access_point(ssid)
+            attempt_started = time.monotonic()
+            success, message = await backend.connect(
+                ssid, password, bssid=target.bssid if target is not None else None
+            )
+            failure = None if success else classify_connect_failure(message)
+            wifi_connect_attempt_duration.observe(
+                time.monotonic() - attempt_started,
+                failure or "ok",
+                "yes" if target is not None else "no",
+            )
+            if failure is None or failure == "auth":
+                break
+            if attempt == WIFI_CONNECT_ATTEMPTS or deadline_expired():
+                break
+            if failure == "not_found":
+                request_rescan()
+            await asyncio.sleep(time_left(backoff))
+            backoff = min(backoff * 2, WIFI_CONNECT_BACKOFF_MAX)
+        return success, message
+    finally:
+        observe_switch("connect", started, success)
+        invalidate_wifi_status()
+        # Connecting saves (or updates) a profile for the network
+        invalidate_wifi_profiles()
+
+
+def observe_switch(method: str, started: float, success: bool) -> float:
+    """Record how long joining a network took; returns the seconds elapsed"""
+    elapsed = time.monotonic() - started
+    wifi_switch_duration.observe(elapsed, method, "ok" if success else "failed")
+    return elapsed
+
+
+# Seconds saved-profile metadata is served before the backend is asked again.
+# Every change made through the API invalidates it, so this only bounds how
+# long edits made outside the server (e.g. by hand with nmcli) go unseen.
+WIFI_PROFILES_TTL = float(os.environ.get("RLN_WIFI_PROFILES_TTL", "300"))
+
+
+async def read_wifi_profiles() -> list[WiFiProfile]:
+    """List saved profiles through the WiFi backend, bypassing the cache"""
+    profiles = await get_wifi_backend().list_profiles()
+    return [
+        WiFiProfile(name=p.name, ssid=p.ssid, active=p.active)
+        for p in sorted(profiles, key=lambda p: p.name.lower())
+    ]
+
+
+wifi_profiles_cache: AsyncTTLCache[list[WiFiProfile]] = AsyncTTLCache(
+    read_wifi_profiles, ttl=WIFI_PROFILES_TTL
+)
 
 
-def connect_to_wifi(ssid: str, password: str) -> tuple[bool, str]:
-    """Connect to WiFi network using nmcli"""
-    result = run_sudo_command(
-        ["nmcli", "dev", "wifi", "connect", ssid, "password", password],
-        timeout=60,
-    )
-    if result.success:
-        return True, f"Connected to {ssid}"
-    return False, result.stderr
+def invalidate_wifi_profiles() -> None:
+    """Force the next profile listing to go to the WiFi backend"""
+    wifi_profiles_cache.invalidate()
+
+
+async def get_wifi_profiles() -> WiFiProfileList:
+    """Get saved profiles, served from cache"""
+    profiles = await wifi_profiles_cache.get()
+    cached = wifi_profiles_cache.peek()
+    return WiFiProfileList(profiles=profiles, age=cached[1] if cached else 0.0)
+
+
+async def find_wifi_profile(name: str) -> WiFiProfile:
+    """Look up a saved profile by name, or raise a 404"""
+    try:
+        profiles = await wifi_profiles_cache.get()
+    except RuntimeError as e:
+        raise fastapi.HTTPException(status_code=503, detail=str(e))
+    for profile in profiles:
+        if profile.name == name:
+            return profile
+    raise fastapi.HTTPException(status_code=404, detail=f"No saved profile {name!r}")
+
+
+# Seconds scan results are reused before the backend is asked again
+WIFI_SCAN_TTL = float(os.environ.get("RLN_WIFI_SCAN_TTL", "15"))
+
+# Minimum seconds between scans that make the radio rescan
+WIFI_RESCAN_INTERVAL = float(os.environ.get("RLN_WIFI_RESCAN_INTERVAL", "30"))
+
+_rescan_requested = False
+_last_rescan = float("-inf")
+
+
+def request_rescan() -> None:
+    """Make the next scan ask the radio for fresh results"""
+    global _rescan_requested, _last_rescan
+    _last_rescan = time.monotonic()
+    _rescan_requested = True
+    wifi_scan_cache.invalidate()
+
+
+def summarise_networks(scanned: list[ScannedNetwork]) -> list[WiFiNetwork]:
+    """Keep the strongest access point per SSID, strongest first, hidden dropped"""
+    best: dict[str, ScannedNetwork] = {}
+    for network in scanned:
+        if not network.ssid:
+            continue
+        current = best.get(network.ssid)
+        if (
+            current is None
+            or network.in_use
+            or (network.signal > current.signal and not current.in_use)
+        ):
+            best[network.ssid] = network
+    return [
+        WiFiNetwork(
+            ssid=n.ssid,
+            bssid=n.bssid,
+            signal=n.signal,
+            security=n.security,
+            channel=n.channel,
+            in_use=n.in_use,
+        )
+        for n in sorted(best.values(), key=lambda n: n.signal, reverse=True)
+    ]
+
+
+async def read_wifi_networks() -> list[WiFiNetwork]:
+    """Scan through the WiFi backend, bypassing the cache"""
+    global _rescan_requested
+    rescan = _rescan_requested
+    _rescan_requested = False
+    return summarise_networks(await get_wifi_backend().scan(rescan=rescan))
+
+
+wifi_scan_cache: AsyncTTLCache[list[WiFiNetwork]] = AsyncTTLCache(
+    read_wifi_networks, ttl=WIFI_SCAN_TTL
+)
+
+
+async def get_wifi_networks(rescan: bool = False) -> WiFiNetworkList:
+    """Get nearby networks from cache, rescanning at most every WIFI_RESCAN_INTERVAL"""
+    if rescan and time.monotonic() - _last_rescan >= WIFI_RESCAN_INTERVAL:
+        request_rescan()
+    networks = await wifi_scan_cache.get()
+    cached = wifi_scan_cache.peek()
+    return WiFiNetworkList(networks=networks, age=cached[1] if cached else 0.0)
 
 
-def restart_display_service() -> tuple[bool, str]:
+async def restart_display_service() -> tuple[bool, str]:
     """Restart the display service after WiFi changes"""
-    result = run_sudo_command(["systemctl", "restart", "display_driver.service"])
-    if result.success:
+    success, message = await restart_scheduler.request_restart("display_driver.service")
+    if success:
         return True, "Display service restarted"
-    return False, result.stderr
+    return False, message
 
 
 @router.get("")
-def get_wifi_status() -> WiFiStatus:
+async def get_wifi_status() -> WiFiStatus:
     """Get current WiFi connection status"""
-    return get_current_wifi_status()
+    return await get_current_wifi_status()
+
+
+@router.get("/networks")
+async def list_wifi_networks(rescan: bool = False) -> WiFiNetworkList:
+    """List nearby WiFi networks, strongest first
+
+    Results are cached and shared between concurrent callers; `rescan`
+    asks the radio for a fresh scan, throttled to one per interval.
+    """
+    try:
+        return await get_wifi_networks(rescan)
+    except RuntimeError as e:
+        raise fastapi.HTTPException(status_code=503, detail=str(e))
 
 
 @router.post("")
-def set_wifi(config: WiFiConfig) -> WiFiResult:
-    """Configure WiFi: set country code and connect to network"""
+async def set_wifi(config: WiFiConfig) -> WiFiResult:
+    """Configure WiFi: set country code and connect to network
+
+    Runs after any WiFi change in progress; requests queued behind it
+    collapse into the latest one, and all of their callers get its result.
+    The whole change runs under the default request deadline.
+    """
+    with deadline_scope():
+        return await resource_coordinator.submit(
+            WIFI_RESOURCE, lambda: apply_wifi_config(config), key="set_wifi"
+        )
+
+
+async def apply_wifi_config(config: WiFiConfig) -> WiFiResult:
+    """Set country code, connect to network and restart the display"""
     errors = []
 
     # Set regulatory country first
-    country_success, country_msg = set_regulatory_country(config.country)
+    country_success, country_msg = await set_regulatory_country(config.country)
     if not country_success:
         errors.append(f"Country code: {country_msg}")
 
     # Connect to WiFi
-    wifi_success, wifi_msg = connect_to_wifi(config.ssid, config.password)
+    wifi_success, wifi_msg = await connect_to_wifi(config.ssid, config.password)
     if not wifi_success:
         errors.append(f"WiFi connection: {wifi_msg}")
 
     # FIXED: Always restart display service after WiFi update
-    display_success, display_msg = restart_display_service()
+    display_success, display_msg = await restart_display_service()
     if not display_success:
         errors.append(f"Display restart: {display_msg}")
 
@@ -135,3 +417,91 @@ def set_wifi(config: WiFiConfig) -> WiFiResult:
             message="Failed to connect",
             error="; ".join(errors),
         )
+
+
+async def switch_to_profile(name: str) -> tuple[str, bool, str, float]:
+    """Activate a saved profile; returns its SSID, the outcome and seconds taken"""
+    profile = await find_wifi_profile(name)
+    started = time.monotonic()
+    success = False
+    try:
+        success, message = await get_wifi_backend().activate_profile(name)
+    finally:
+        elapsed = observe_switch("profile", started, success)
+        invalidate_wifi_status()
+        invalidate_wifi_profiles()
+    return profile.ssid, success, message, elapsed
+
+
+@router.get("/profiles")
+async def list_wifi_profiles() -> WiFiProfileList:
+    """List saved WiFi profiles"""
+    try:
+        return await get_wifi_profiles()
+    except RuntimeError as e:
+        raise fastapi.HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/profiles")
+async def add_wifi_profile(profile: WiFiProfileCreate) -> WiFiResult:
+    """Save a profile for a network without connecting to it
+
+    The WPA key is derived from the password once, here, so activating the
+    profile later does not have to.
+    """
+    try:
+        success, message = await resource_coordinator.submit(
+            WIFI_RESOURCE,
+            lambda: get_wifi_backend().add_profile(profile.ssid, profile.password),
+            key=f"add_profile:{profile.ssid}",
+        )
+    finally:
+        invalidate_wifi_profiles()
+    if success:
+        return WiFiResult(success=True, message=message)
+    return WiFiResult(success=False, message="Failed to save profile", error=message)
+
+
+@router.delete("/profiles/{name}", responses={404: {"model": ErrorResponse}})
+async def remove_wifi_profile(name: str) -> WiFiResult:
+    """Delete a saved WiFi profile"""
+    await find_wifi_profile(name)
+    try:
+        success, message = await resource_coordinator.submit(
+            WIFI_RESOURCE,
+            lambda: get_wifi_backend().remove_profile(name),
+            key=f"remove_profile:{name}",
+        )
+    finally:
+        invalidate_wifi_profiles()
+    if success:
+        return WiFiResult(success=True, message=message)
+    return WiFiResult(success=False, message="Failed to remove profile", error=message)
+
+
+@router.post("/profiles/{name}/activate", responses={404: {"model": ErrorResponse}})
+async def activate_wifi_profile(name: str) -> WiFiSwitchResult:
+    """Switch to a saved WiFi profile
+
+    `elapsed` is the time taken to bring the connection up, in seconds.
+    """
+    await find_wifi_profile(name)
+    # Switching again before this one starts only applies the newest choice
+    ssid, success, message, elapsed = await resource_coordinator.submit(
+        WIFI_RESOURCE, lambda: switch_to_profile(name), key="switch"
+    )
+    if not success:
+        return WiFiSwitchResult(
+            success=False,
+            message="Failed to connect",
+            error=message,
+            elapsed=elapsed,
+        )
+
+    display_success, display_msg = await restart_display_service()
+    return WiFiSwitchResult(
+        success=True,
+        message=f"Wi-Fi restarting – wait for IP to be displayed on the RLN Z2. Connected to {ssid}",
+        error=None if display_success else f"Display restart: {display_msg}",
+        elapsed=elapsed,
+    )
@@ -1,3 +1,19 @@
-from .subprocess_runner import run_command, CommandResult
+from .subprocess_runner import (
+    run_command,
+    run_command_async,
+    run_sudo_command_async,
+    run_sudo_command_streaming,
+    stream_command_async,
+    CommandResult,
+    OutputLine,
+)
 
-__all__ = ["run_command", "CommandResult"]
+__all__ = [
+    "run_command",
+    "run_command_async",
+    "run_sudo_command_async",
+    "run_sudo_command_streaming",
+    "stream_command_async",
+    "CommandResult",
+    "OutputLine",
+]
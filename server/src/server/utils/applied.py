@@ -0,0 +1,104 @@
+import base64
+import functools
+import hashlib
+import json
+import os
+import secrets
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from server.utils.files import atomic_write_text
+
+# Fingerprints of the settings last applied successfully, used to skip
+# steps whose desired state is already in effect
+APPLIED_STATE_PATH = Path(
+    os.environ.get("RLN_APPLIED_STATE_PATH", "/home/rln/.rln-applied.json")
+)
+
+# Message for steps skipped because their desired state is already in effect
+ALREADY_APPLIED = "Already applied"
+
+# scrypt cost for secret fingerprints; a few milliseconds on a Pi Zero 2
+SCRYPT_N = 2**12
+
+
+@dataclass
+class AppliedState:
+    """Per-step fingerprints plus the salt used to hash secrets into them"""
+
+    salt: str = field(default_factory=lambda: secrets.token_hex(16))
+    fingerprints: dict[str, str] = field(default_factory=dict)
+
+
+_state: AppliedState | None = None
+_state_path: Path | None = None
+
+
+def load_applied_state() -> AppliedState:
+    """Read the snapshot file once; a missing or corrupt file starts empty"""
+    global _state, _state_path
+    if _state is not None and _state_path == APPLIED_STATE_PATH:
+        return _state
+    try:
+        data = json.loads(APPLIED_STATE_PATH.read_text())
+        _state = AppliedState(
+            salt=str(data["salt"]),
+            fingerprints={str(k): str(v) for k, v in data["fingerprints"].items()},
+        )
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        _state = AppliedState()
+    _state_path = APPLIED_STATE_PATH
+    return _state
+
+
+def _save(state: AppliedState) -> None:
+    text = json.dumps({"salt": state.salt, "fingerprints": state.fingerprints})
+    atomic_write_text(APPLIED_STATE_PATH, text, mode=0o600)
+
+
+@functools.lru_cache(maxsize=8)
+def _secret_digest(secret: str, salt: str) -> bytes:
+    # Cached because one password often feeds several steps
+    return hashlib.scrypt(secret.encode(), salt=salt.encode(), n=SCRYPT_N, r=8, p=1)
+
+
+def fingerprint(*values: str, secrets: tuple[str, ...] = ()) -> str:
+    """
+    Digest of a step's inputs. Secrets only enter as salted scrypt hashes, so
+    the snapshot file never holds anything a password can be read back from.
+    """
+    state = load_applied_state()
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(json.dumps(value).encode())
+    for secret in secrets:
+        digest.update(_secret_digest(secret, state.salt))
+    return base64.b64encode(digest.digest()).decode()
+
+
+def is_applied(key: str, digest: str) -> bool:
+    """Whether `key` was last applied with exactly this fingerprint"""
+    return load_applied_state().fingerprints.get(key) == digest
+
+
+def record_applied(key: str, digest: str) -> None:
+    """Remember that `key` is now in effect with this fingerprint"""
+    state = load_applied_state()
+    if state.fingerprints.get(key) == digest:
+        return
+    state.fingerprints[key] = digest
+    try:
+        _save(state)
+    except OSError:
+        # Not fatal: the step will just run again next time
+        pass
+
+
+def forget_applied(key: str) -> None:
+    """Drop `key` so its step runs on the next apply"""
+    state = load_applied_state()
+    if state.fingerprints.pop(key, None) is not None:
+        try:
+            _save(state)
+        except OSError:
+            pass
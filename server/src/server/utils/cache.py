@@ -0,0 +1,59 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class AsyncTTLCache(Generic[T]):
+    """
+    Cache a single async-loaded value for a fixed time.
+
+    Concurrent callers that find the value missing or expired share one
+    in-flight load instead of each starting their own. invalidate() drops
+    the cached value, and any load already in flight is not stored, so the
+    next caller always sees state read after the invalidation.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[T]], ttl: float):
+        self._loader = loader
+        self.ttl = ttl
+        self._entry: tuple[T, float] | None = None
+        self._generation = 0
+        self._inflight: asyncio.Task[T] | None = None
+
+    async def _load(self, generation: int) -> T:
+        value = await self._loader()
+        if generation == self._generation:
+            self._entry = (value, time.monotonic())
+        return value
+
+    async def get(self) -> T:
+        """Return the cached value, loading it if missing or expired"""
+        entry = self._entry
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+
+        inflight = self._inflight
+        if (
+            inflight is None
+            or inflight.done()
+            or inflight.get_loop() is not asyncio.get_running_loop()
+        ):
+            inflight = asyncio.ensure_future(self._load(self._generation))
+            self._inflight = inflight
+        # Shield so one caller being cancelled doesn't cancel the shared load
+        return await asyncio.shield(inflight)
+
+    def peek(self) -> tuple[T, float] | None:
+        """Return the last loaded value and its age in seconds, even if stale"""
+        if self._entry is None:
+            return None
+        value, loaded_at = self._entry
+        return value, time.monotonic() - loaded_at
+
+    def invalidate(self) -> None:
+        """Forget the cached value and detach any load in flight"""
+        self._generation += 1
+        self._entry = None
+        self._inflight = None
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from server.utils.deadline import DEADLINE_EXCEEDED, deadline_expired
+
+
+@dataclass
+class DagStep:
+    """A step that may start once every step named in `after` has finished
+
+    A step with a `skip` reason is not run; it succeeds with that message.
+    """
+
+    name: str
+    run: Callable[[], Awaitable[tuple[bool, str]]]
+    after: tuple[str, ...] = ()
+    skip: str | None = None
+
+
+@dataclass
+class StepOutcome:
+    name: str
+    success: bool
+    message: str
+    elapsed: float
+    skipped: bool = False
+    # Failed after the request deadline passed, likely because of it
+    timed_out: bool = False
+
+
+def validate_dag(steps: list[DagStep]) -> None:
+    """Raise ValueError on duplicate names, unknown dependencies or cycles"""
+    by_name: dict[str, DagStep] = {}
+    for step in steps:
+        if step.name in by_name:
+            raise ValueError(f"Duplicate step: {step.name}")
+        by_name[step.name] = step
+    for step in steps:
+        for dependency in step.after:
+            if dependency not in by_name:
+                raise ValueError(f"Step {step.name} depends on unknown {dependency}")
+
+    visiting: set[str] = set()
+    visited: set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through {name}")
+        visiting.add(name)
+        for dependency in by_name[name].after:
+            visit(dependency)
+        visiting.discard(name)
+        visited.add(name)
+
+    for step in steps:
+        visit(step.name)
+
+
+async def run_dag(
+    steps: list[DagStep],
+    on_start: Callable[[str], None] | None = None,
+    on_finish: Callable[[StepOutcome], None] | None = None,
+) -> dict[str, StepOutcome]:
+    """
+    Run steps concurrently, starting each one as soon as its dependencies finish.
+
+    Dependencies only constrain ordering: a step still runs if one it waits
+    for failed, matching the sequential code this replaces. Exceptions
+    raised by a step are recorded as a failed outcome. Once the request
+    deadline has passed, steps not yet started are skipped as failed.
+
+    Returns:
+        Outcomes keyed by step name, in the order the steps were declared
+    """
+    validate_dag(steps)
+    tasks: dict[str, asyncio.Task[StepOutcome]] = {}
+
+    async def run_step(step: DagStep) -> StepOutcome:
+        if step.after:
+            await asyncio.gather(*(tasks[name] for name in step.after))
+        skip, success = step.skip, True
+        if skip is None and deadline_expired():
+            skip, success = DEADLINE_EXCEEDED, False
+        if skip is not None:
+            outcome = StepOutcome(
+                name=step.name,
+                success=success,
+                message=skip,
+                elapsed=0.0,
+                skipped=True,
+            )
+            if on_finish is not None:
+                on_finish(outcome)
+            return outcome
+        if on_start is not None:
+            on_start(step.name)
+        started = time.monotonic()
+        try:
+            success, message = await step.run()
+        except Exception as e:
+            success, message = False, str(e)
+        outcome = StepOutcome(
+            name=step.name,
+            success=success,
+            message=message,
+            elapsed=time.monotonic() - started,
+            timed_out=not success and deadline_expired(),
+        )
+        if on_finish is not None:
+            on_finish(outcome)
+        return outcome
+
+    for step in steps:
+        tasks[step.name] = asyncio.ensure_future(run_step(step))
+    try:
+        await asyncio.gather(*tasks.values())
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    return {name: task.result() for name, task in tasks.items()}
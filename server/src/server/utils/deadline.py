@@ -0,0 +1,79 @@
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+# Seconds a configuration request may take when the client sets no budget
+REQUEST_TIMEOUT = float(os.environ.get("RLN_REQUEST_TIMEOUT", "300"))
+
+# Longest budget a client may ask for
+MAX_REQUEST_TIMEOUT = float(os.environ.get("RLN_MAX_REQUEST_TIMEOUT", "900"))
+
+# Message for commands refused and steps skipped once the budget is spent
+DEADLINE_EXCEEDED = "Request deadline exceeded"
+
+
+class Deadline:
+    """
+    Time budget shared by everything one request does.
+
+    Made current with deadline_scope(); commands run under it have their
+    timeout cut to what is left, and are refused once it has passed.
+    asyncio tasks and threads started inside the scope inherit it.
+    """
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def current_deadline() -> Deadline | None:
+    return _current_deadline.get()
+
+
+def deadline_expired() -> bool:
+    """Whether the current request has used up its budget"""
+    deadline = _current_deadline.get()
+    return deadline is not None and deadline.expired
+
+
+def time_left(timeout: float) -> float:
+    """`timeout` cut down to what is left of the current deadline"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return timeout
+    return min(timeout, deadline.remaining())
+
+
+def command_timeout(timeout: int) -> int:
+    """Whole-second command timeout within the current deadline; 0 once spent"""
+    return min(timeout, math.ceil(time_left(timeout)))
+
+
+@contextmanager
+def deadline_scope(budget: float | None = None) -> Iterator[Deadline]:
+    """Run the block with a deadline `budget` seconds away
+
+    Without a budget, REQUEST_TIMEOUT applies; no budget may exceed
+    MAX_REQUEST_TIMEOUT.
+    """
+    deadline = Deadline(min(budget or REQUEST_TIMEOUT, MAX_REQUEST_TIMEOUT))
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
@@ -0,0 +1,44 @@
+import os
+import tempfile
+from pathlib import Path
+
+
+def atomic_write_text(path: Path, text: str, mode: int = 0o644) -> None:
+    """
+    Replace a file's contents so readers see either the old or the new file.
+
+    Writes to a temporary file in the same directory, fsyncs it, renames it
+    over `path` and fsyncs the directory. Mode and, where permitted, owner of
+    an existing file are carried over; a new file gets `mode`.
+    """
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            existing = os.stat(path)
+        except FileNotFoundError:
+            os.chmod(tmp_name, mode)
+        else:
+            os.chmod(tmp_name, existing.st_mode & 0o7777)
+            try:
+                os.chown(tmp_name, existing.st_uid, existing.st_gid)
+            except PermissionError:
+                pass
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
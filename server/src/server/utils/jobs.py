@@ -0,0 +1,215 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Literal
+
+# Number of finished jobs kept in memory for status queries
+JOB_HISTORY = int(os.environ.get("RLN_JOB_HISTORY", "20"))
+
+# Command output lines recorded per job; later lines are dropped
+JOB_OUTPUT_LINES = int(os.environ.get("RLN_JOB_OUTPUT_LINES", "1000"))
+
+JobStatus = Literal["pending", "running", "completed", "failed", "cancelled"]
+StepStatus = Literal[
+    "pending", "running", "succeeded", "failed", "timed_out", "skipped"
+]
+
+
+@dataclass
+class JobEvent:
+    id: int
+    type: str
+    data: dict[str, Any]
+
+
+@dataclass
+class StepState:
+    name: str
+    status: StepStatus = "pending"
+    message: str = ""
+    error: str | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def elapsed(self) -> float | None:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "message": self.message,
+            "error": self.error,
+            "elapsed": self.elapsed,
+        }
+
+
+@dataclass
+class Job:
+    """A unit of background work made of named steps.
+
+    Every state change is appended to `events`, which `stream()` replays
+    and then follows until the job finishes, and passed to `listeners`.
+    """
+
+    id: str
+    kind: str
+    status: JobStatus = "pending"
+    steps: dict[str, StepState] = field(default_factory=dict)
+    result: Any = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    events: list[JobEvent] = field(default_factory=list)
+    output_lines: int = 0
+    listeners: list[Callable[[JobEvent], None]] = field(
+        default_factory=list, repr=False
+    )
+    _updated: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def _emit(self, type: str, data: dict[str, Any]) -> None:
+        event = JobEvent(id=len(self.events) + 1, type=type, data=data)
+        self.events.append(event)
+        for listener in self.listeners:
+            listener(event)
+        # Wake current subscribers and arm a fresh event for the next change
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def plan(self, names: list[str]) -> None:
+        """Declare the steps this job will run, in order"""
+        for name in names:
+            self.steps.setdefault(name, StepState(name=name))
+        self._emit("planned", {"steps": [s.to_dict() for s in self.steps.values()]})
+
+    def start_step(self, name: str) -> None:
+        step = self.steps.setdefault(name, StepState(name=name))
+        step.status = "running"
+        step.started_at = time.monotonic()
+        self._emit("step", step.to_dict())
+
+    def finish_step(
+        self, name: str, success: bool, message: str = "", error: str | None = None
+    ) -> None:
+        self._end_step(name, "succeeded" if success else "failed", message, error)
+
+    def time_out_step(self, name: str, message: str, error: str | None = None) -> None:
+        """Record a step cut short by the request deadline"""
+        self._end_step(name, "timed_out", message, error)
+
+    def _end_step(
+        self, name: str, status: StepStatus, message: str, error: str | None
+    ) -> None:
+        step = self.steps.setdefault(name, StepState(name=name))
+        step.status = status
+        step.message = message
+        step.error = error
+        step.finished_at = time.monotonic()
+        if step.started_at is None:
+            step.started_at = step.finished_at
+        self._emit("step", step.to_dict())
+
+    def skip_step(self, name: str, message: str = "") -> None:
+        step = self.steps.setdefault(name, StepState(name=name))
+        step.status = "skipped"
+        step.message = message
+        self._emit("step", step.to_dict())
+
+    def output(self, step: str, stream: str, text: str) -> None:
+        """Record a line of command output from `step`"""
+        if self.output_lines > JOB_OUTPUT_LINES:
+            return
+        self.output_lines += 1
+        if self.output_lines > JOB_OUTPUT_LINES:
+            stream, text = "stderr", "[further output not recorded]"
+        self._emit("output", {"step": step, "stream": stream, "text": text})
+
+    def finish(
+        self, status: JobStatus, result: Any = None, error: str | None = None
+    ) -> None:
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self._emit("job", {"status": status, "error": error})
+
+    async def stream(self, after: int = 0) -> AsyncIterator[JobEvent]:
+        """Yield events with id greater than `after`, following live updates"""
+        position = after
+        while True:
+            updated = self._updated
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.done:
+                return
+            await updated.wait()
+
+
+class JobManager:
+    """Runs jobs as asyncio tasks and keeps a bounded history of finished ones"""
+
+    def __init__(self, history: int = JOB_HISTORY):
+        self.history = history
+        self._jobs: dict[str, Job] = {}
+        self._finished: OrderedDict[str, None] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+
+    def submit(
+        self,
+        kind: str,
+        run: Callable[[Job], Awaitable[Any]],
+        steps: list[str] | None = None,
+        job_id: str | None = None,
+    ) -> Job:
+        """Start `run(job)` in the background and return the job immediately"""
+        job = Job(id=job_id or uuid.uuid4().hex, kind=kind)
+        if steps:
+            job.plan(steps)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.ensure_future(self._run(job, run))
+        return job
+
+    async def _run(self, job: Job, run: Callable[[Job], Awaitable[Any]]) -> None:
+        job.status = "running"
+        try:
+            result = await run(job)
+        except asyncio.CancelledError:
+            job.finish("cancelled", error="Job cancelled")
+            raise
+        except Exception as e:
+            job.finish("failed", error=str(e))
+        else:
+            job.finish("completed", result=result)
+        finally:
+            self._tasks.pop(job.id, None)
+            self._retire(job.id)
+
+    def _retire(self, job_id: str) -> None:
+        self._finished[job_id] = None
+        while len(self._finished) > self.history:
+            oldest, _ = self._finished.popitem(last=False)
+            self._jobs.pop(oldest, None)
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    async def shutdown(self) -> None:
+        """Cancel jobs that are still running"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+job_manager = JobManager()
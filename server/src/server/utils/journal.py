@@ -0,0 +1,188 @@
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from server.utils.applied import ALREADY_APPLIED
+from server.utils.jobs import Job, JobEvent
+
+# Append-only log of jobs in progress, replayed on startup to resume a job
+# that a restart interrupted. Passwords are blanked out of the requests it
+# holds; it is still created mode 0600 and emptied once no job is open.
+APPLY_JOURNAL_PATH = Path(
+    os.environ.get("RLN_APPLY_JOURNAL_PATH", "/home/rln/.rln-apply-journal")
+)
+
+# Times a job may be resumed before it is given up on, so a step that
+# takes the server down is not re-run on every boot
+APPLY_RESUME_ATTEMPTS = int(os.environ.get("RLN_APPLY_RESUME_ATTEMPTS", "3"))
+
+# Message for steps a resumed job does not repeat
+COMPLETED_BEFORE_RESTART = "Completed before the server restarted"
+
+# Messages of skipped steps that need not run again. Other skips, such as
+# for the request deadline, did nothing, so a resumed job runs them.
+COMPLETED_SKIPS = (ALREADY_APPLIED, COMPLETED_BEFORE_RESTART)
+
+# Message for steps a resumed job cannot run, their passwords not journalled
+SECRETS_NOT_KEPT = "Not resumed: passwords are not kept across restarts; apply again"
+
+
+@dataclass
+class UnfinishedJob:
+    """A journalled job with no finish record"""
+
+    id: str
+    kind: str
+    steps: list[str]
+    payload: dict[str, Any]
+    # Step name -> (status, message) of steps that completed
+    completed: dict[str, tuple[str, str]] = field(default_factory=dict)
+    # Times it has already been resumed
+    resumes: int = 0
+
+
+def read_journal(path: Path) -> list[UnfinishedJob]:
+    """Jobs that were planned but never finished, oldest first
+
+    A torn last line, left by a crash mid-write, is ignored.
+    """
+    jobs: dict[str, UnfinishedJob] = {}
+    try:
+        lines = path.read_text().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return []
+    for line in lines:
+        try:
+            record = json.loads(line)
+            job_id = str(record["job"])
+            if record["type"] == "planned":
+                jobs[job_id] = UnfinishedJob(
+                    id=job_id,
+                    kind=str(record["kind"]),
+                    steps=[str(step) for step in record["steps"]],
+                    payload=dict(record["payload"]),
+                )
+            elif record["type"] == "step" and job_id in jobs:
+                completed = jobs[job_id].completed
+                if record["status"] == "succeeded" or (
+                    record["status"] == "skipped"
+                    and record["message"] in COMPLETED_SKIPS
+                ):
+                    completed[record["step"]] = (record["status"], record["message"])
+                else:
+                    completed.pop(record["step"], None)
+            elif record["type"] == "resumed" and job_id in jobs:
+                jobs[job_id].resumes += 1
+            elif record["type"] == "finished":
+                jobs.pop(job_id, None)
+        except (ValueError, KeyError, TypeError):
+            continue
+    return list(jobs.values())
+
+
+class ApplyJournal:
+    """
+    Crash-safe record of which steps of each job have completed.
+
+    Every record is appended as one JSON line and fsynced before the job
+    moves on. A job cancelled by shutdown gets no finish record, so it is
+    still unfinished when the server starts again. Journal write failures
+    are not fatal; the job just cannot be resumed.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self._path = path
+        self._fd: int | None = None
+        self._open_jobs: set[str] = set()
+
+    @property
+    def path(self) -> Path:
+        return self._path if self._path is not None else APPLY_JOURNAL_PATH
+
+    def _open(self) -> int:
+        if self._fd is None:
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            # End a line torn by a crash so the next record starts on its own
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b"\n":
+                os.write(fd, b"\n")
+            self._fd = fd
+        return self._fd
+
+    def _append(self, record: dict[str, Any]) -> None:
+        try:
+            fd = self._open()
+            os.write(fd, json.dumps(record).encode() + b"\n")
+            os.fsync(fd)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Empty the journal; nothing in it is left to resume"""
+        try:
+            fd = self._open()
+            os.ftruncate(fd, 0)
+            os.fsync(fd)
+        except OSError:
+            pass
+
+    def track(self, job: Job, payload: dict[str, Any], resumed: bool = False) -> None:
+        """Journal `job` until it finishes
+
+        `payload` is what the job needs to run again, less its passwords.
+        A `resumed` job is already in the journal under the same id; the
+        resume is counted towards APPLY_RESUME_ATTEMPTS.
+        """
+        self._open_jobs.add(job.id)
+        if resumed:
+            self._append({"type": "resumed", "job": job.id})
+        else:
+            self._append(
+                {
+                    "type": "planned",
+                    "job": job.id,
+                    "kind": job.kind,
+                    "steps": list(job.steps),
+                    "payload": payload,
+                }
+            )
+        job.listeners.append(lambda event: self._record(job, event))
+
+    def _record(self, job: Job, event: JobEvent) -> None:
+        if event.type == "step" and event.data["status"] not in ("pending", "running"):
+            self._append(
+                {
+                    "type": "step",
+                    "job": job.id,
+                    "step": event.data["name"],
+                    "status": event.data["status"],
+                    "message": event.data["message"],
+                }
+            )
+        elif event.type == "job" and event.data["status"] != "cancelled":
+            self._append({"type": "finished", "job": job.id})
+            self._open_jobs.discard(job.id)
+            if not self._open_jobs:
+                # Nothing left to resume
+                self.clear()
+
+    def unfinished(self, kind: str) -> list[UnfinishedJob]:
+        """Jobs of `kind` left unfinished by the previous run of the server
+
+        Jobs already resumed APPLY_RESUME_ATTEMPTS times are left out.
+        """
+        return [
+            job
+            for job in read_journal(self.path)
+            if job.kind == kind and job.resumes < APPLY_RESUME_ATTEMPTS
+        ]
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+apply_journal = ApplyJournal()
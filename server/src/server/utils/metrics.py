@@ -0,0 +1,235 @@
+import bisect
+import math
+import time
+from typing import Any, Awaitable, Callable, MutableMapping, TypeVar
+
+# Minimal Prometheus text-format metrics, kept in-process so the server needs
+# no extra dependency and scraping costs no subprocesses
+
+LabelValues = tuple[str, ...]
+MetricT = TypeVar("MetricT", "Counter", "Histogram")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COMMAND_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in sorted(self._values.items()):
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (last is +Inf), sum
+        self._series: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = ([0] * (len(self.buckets) + 1), [0.0])
+            self._series[labelvalues] = series
+        counts, total = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labelvalues, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, labelvalues, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram] = []
+
+    def register(self, metric: MetricT) -> MetricT:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+command_duration = registry.register(
+    Histogram(
+        "rln_command_duration_seconds",
+        "Wall time of system commands by executable",
+        ("executable",),
+        COMMAND_BUCKETS,
+    )
+)
+command_timeouts = registry.register(
+    Counter(
+        "rln_command_timeouts_total",
+        "System commands killed after their timeout",
+        ("executable",),
+    )
+)
+command_not_found = registry.register(
+    Counter(
+        "rln_command_not_found_total",
+        "System commands whose executable was missing",
+        ("executable",),
+    )
+)
+command_failures = registry.register(
+    Counter(
+        "rln_command_failures_total",
+        "System commands that exited non-zero or could not be started",
+        ("executable",),
+    )
+)
+wifi_switch_duration = registry.register(
+    Histogram(
+        "rln_wifi_switch_seconds",
+        "Time to join a WiFi network, by saved profile or by SSID and password",
+        ("method", "outcome"),
+        COMMAND_BUCKETS,
+    )
+)
+wifi_connect_attempt_duration = registry.register(
+    Histogram(
+        "rln_wifi_connect_attempt_seconds",
+        "Time to connected, or to failure, of each attempt to join a network",
+        ("outcome", "pinned"),
+        COMMAND_BUCKETS,
+    )
+)
+resource_coalesced = registry.register(
+    Counter(
+        "rln_resource_coalesced_total",
+        "Queued changes to a resource superseded by a newer request",
+        ("resource",),
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        "rln_http_request_duration_seconds",
+        "Time to the start of the HTTP response by route",
+        ("method", "route", "status"),
+    )
+)
+
+
+def command_executable(args: list[str]) -> str:
+    """Name a command by its target executable, looking through sudo"""
+    if args and args[0] == "sudo":
+        target = [arg for arg in args[1:] if not arg.startswith("-")]
+        args = target or args
+    return args[0].rsplit("/", 1)[-1] if args else ""
+
+
+def observe_command(args: list[str], duration: float, outcome: str) -> None:
+    """Record one command run; outcome is ok, failed, timeout or not_found"""
+    executable = command_executable(args)
+    command_duration.observe(duration, executable)
+    if outcome == "timeout":
+        command_timeouts.inc(executable)
+    elif outcome == "not_found":
+        command_not_found.inc(executable)
+    elif outcome == "failed":
+        command_failures.inc(executable)
+
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing HTTP requests by matched route template"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        responded = False
+
+        def observe(status: int) -> None:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - started, scope["method"], route, str(status)
+            )
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal responded
+            if message["type"] == "http.response.start":
+                responded = True
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not responded:
+                observe(500)
+            raise
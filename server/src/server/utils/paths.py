@@ -0,0 +1,4 @@
+# Paths shared by the API server and the privileged helper. Kept free of
+# imports so the helper, which runs as root, loads none of the web stack.
+
+CONFIGURE_ASL_SCRIPT = "/home/rln/configure-asl3.sh"
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import os
+from typing import Any, Callable, List, Optional
+
+from server.utils.metrics import observe_command
+from server.utils.subprocess_runner import CommandResult, OutputLine
+
+# Unix socket of the privileged helper (`server helper`). When set, commands
+# that would run under sudo are sent to the helper instead; when unset or
+# unreachable they fall back to sudo.
+PRIVILEGED_SOCKET = os.environ.get("RLN_PRIVILEGED_SOCKET") or None
+
+# Connections kept open to the helper; also the cap on concurrent requests
+PRIVILEGED_POOL_SIZE = int(os.environ.get("RLN_PRIVILEGED_POOL_SIZE", "4"))
+
+# Longest single message on the socket, e.g. a full `nmcli dev wifi list`
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+# Extra wait on top of the command timeout for the helper's reply
+REPLY_GRACE = 5
+
+
+def encode_message(message: dict[str, Any]) -> bytes:
+    return json.dumps(message).encode() + b"\n"
+
+
+def decode_message(line: bytes) -> dict[str, Any]:
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError("Expected a JSON object")
+    return message
+
+
+def result_to_message(result: CommandResult) -> dict[str, Any]:
+    return {
+        "result": {
+            "success": result.success,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "return_code": result.return_code,
+        }
+    }
+
+
+def _helper_error(error: Exception) -> CommandResult:
+    return CommandResult(
+        success=False,
+        stdout="",
+        stderr=f"Privileged helper error: {error}",
+        return_code=-1,
+    )
+
+
+class HelperUnavailable(Exception):
+    """The helper socket could not be reached"""
+
+
+class RequestNotSent(ConnectionError):
+    """The connection failed before the helper could receive the request"""
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        # Set once a request has had its complete, well-formed reply
+        self.reusable = False
+
+    async def request(
+        self,
+        message: dict[str, Any],
+        on_line: Callable[[OutputLine], None] | None,
+    ) -> CommandResult:
+        self.reusable = False
+        try:
+            self.writer.write(encode_message(message))
+            await self.writer.drain()
+        except ConnectionError as e:
+            raise RequestNotSent(str(e)) from e
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError("Helper closed the connection")
+            reply = decode_message(line)
+            if "line" in reply:
+                if on_line is not None:
+                    on_line(OutputLine(reply["line"]["stream"], reply["line"]["text"]))
+                continue
+            result = reply["result"]
+            command_result = CommandResult(
+                success=bool(result["success"]),
+                stdout=result["stdout"],
+                stderr=result["stderr"],
+                return_code=int(result["return_code"]),
+            )
+            self.reusable = True
+            return command_result
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class PrivilegedClient:
+    """
+    Pooled client for the privileged helper.
+
+    Keeps up to `size` connections open and reuses them, so a privileged
+    command costs one socket round trip instead of a sudo fork/exec and PAM
+    session. Results come back as the usual CommandResult.
+    """
+
+    def __init__(self, path: str, size: int = PRIVILEGED_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle: list[_Connection] = []
+        self._slots: asyncio.Semaphore | None = None
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        return self._slots
+
+    async def _connect(self) -> _Connection:
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.reader.at_eof():
+                return connection
+            # Closed by the helper while idle, e.g. when it restarted
+            connection.close()
+        try:
+            reader, writer = await asyncio.open_unix_connection(
+                self.path, limit=MAX_MESSAGE_BYTES
+            )
+        except OSError as e:
+            raise HelperUnavailable(str(e)) from e
+        return _Connection(reader, writer)
+
+    async def run(
+        self,
+        args: List[str],
+        timeout: int = 30,
+        input_text: Optional[str] = None,
+        on_line: Callable[[OutputLine], None] | None = None,
+    ) -> CommandResult:
+        """
+        Run `args` through the helper.
+
+        Raises:
+            HelperUnavailable: if no connection to the helper could be made
+        """
+        message = {
+            "args": args,
+            "timeout": timeout,
+            "input": input_text,
+            "stream": on_line is not None,
+        }
+        async with self._get_slots():
+            connection = await self._connect()
+            reused = connection.reusable
+            try:
+                result = await self._request(connection, message, timeout, on_line)
+            except RequestNotSent as e:
+                if not reused:
+                    return _helper_error(e)
+                # The helper restarted since this connection was last used;
+                # it never saw the request, so sending it again is safe
+                self.close()
+                connection = await self._connect()
+                try:
+                    result = await self._request(connection, message, timeout, on_line)
+                except ConnectionError as e:
+                    return _helper_error(e)
+            except ConnectionError as e:
+                # The command may have run, so it is not sent again
+                return _helper_error(e)
+            # Only a connection whose reply arrived whole can carry another
+            if connection.reusable:
+                self._idle.append(connection)
+            return result
+
+    async def _request(
+        self,
+        connection: _Connection,
+        message: dict[str, Any],
+        timeout: int,
+        on_line: Callable[[OutputLine], None] | None,
+    ) -> CommandResult:
+        try:
+            return await asyncio.wait_for(
+                connection.request(message, on_line), timeout + REPLY_GRACE
+            )
+        except asyncio.TimeoutError:
+            connection.close()
+            return CommandResult(
+                success=False,
+                stdout="",
+                stderr=f"Command timed out after {timeout} seconds",
+                return_code=-1,
+            )
+        except (ValueError, KeyError) as e:
+            connection.close()
+            return _helper_error(e)
+        except BaseException:
+            connection.close()
+            raise
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+
+_client: PrivilegedClient | None = None
+
+
+def get_privileged_client() -> PrivilegedClient | None:
+    """The shared helper client, or None when no helper socket is configured"""
+    global _client
+    if PRIVILEGED_SOCKET is None:
+        return None
+    if _client is None:
+        _client = PrivilegedClient(PRIVILEGED_SOCKET)
+    return _client
+
+
+def set_privileged_socket(path: str | None) -> None:
+    """Send privileged commands to the helper at `path` (None restores sudo)"""
+    global PRIVILEGED_SOCKET, _client
+    if _client is not None:
+        _client.close()
+    PRIVILEGED_SOCKET = path
+    _client = None
+
+
+def close_privileged_client() -> None:
+    """Close pooled helper connections; they reopen on next use"""
+    if _client is not None:
+        _client.close()
+
+
+async def run_privileged(
+    args: List[str],
+    timeout: int = 30,
+    input_text: Optional[str] = None,
+    on_line: Callable[[OutputLine], None] | None = None,
+) -> CommandResult | None:
+    """
+    Run a command through the helper if one is configured and reachable.
+
+    Returns:
+        CommandResult, or None if the caller should fall back to sudo
+    """
+    client = get_privileged_client()
+    if client is None:
+        return None
+    started = asyncio.get_running_loop().time()
+    try:
+        result = await client.run(args, timeout, input_text, on_line)
+    except HelperUnavailable:
+        return None
+    outcome = "ok" if result.success else "failed"
+    if result.stderr.startswith("Command timed out"):
+        outcome = "timeout"
+    observe_command(args, asyncio.get_running_loop().time() - started, outcome)
+    return result
@@ -0,0 +1,118 @@
+import asyncio
+import contextvars
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, TypeVar
+
+from server.utils.metrics import resource_coalesced
+
+T = TypeVar("T")
+
+# Resources changed by the API. systemd restarts use the unit name.
+WIFI_RESOURCE = "wifi"
+FAVOURITES_RESOURCE = "favourites"
+ASL_RESOURCE = "asl"
+
+
+@dataclass
+class ResourceStats:
+    requested: int = 0
+    performed: int = 0
+
+    @property
+    def coalesced(self) -> int:
+        return self.requested - self.performed
+
+
+@dataclass
+class _Request:
+    key: str | None
+    operation: Callable[[], Coroutine[Any, Any, Any]]
+    future: asyncio.Future[Any]
+    # The submitter's context, so the operation runs under its deadline
+    context: contextvars.Context
+
+
+@dataclass
+class _Resource:
+    loop: asyncio.AbstractEventLoop
+    queue: list[_Request] = field(default_factory=list)
+    worker: asyncio.Task[None] | None = None
+
+
+class ResourceCoordinator:
+    """
+    Run operations on a shared resource one at a time, last writer wins.
+
+    Operations submitted for the same resource run in turn. While one runs,
+    later ones wait in a queue; a queued operation with the same `key` as a
+    new one is replaced by it, and its callers get the newer operation's
+    result, so only the latest desired state is applied. Operations without
+    a key are never merged. Each operation runs in the context it was
+    submitted from, request deadline included.
+    """
+
+    def __init__(self) -> None:
+        self._resources: dict[str, _Resource] = {}
+        self.stats: dict[str, ResourceStats] = {}
+
+    def _get_resource(self, name: str) -> _Resource:
+        loop = asyncio.get_running_loop()
+        resource = self._resources.get(name)
+        if resource is None or resource.loop is not loop:
+            resource = self._resources[name] = _Resource(loop=loop)
+        return resource
+
+    async def submit(
+        self,
+        resource: str,
+        operation: Callable[[], Coroutine[Any, Any, T]],
+        key: str | None = None,
+    ) -> T:
+        """Run `operation` once `resource` is free, or share a newer one's result"""
+        self.stats.setdefault(resource, ResourceStats()).requested += 1
+        state = self._get_resource(resource)
+
+        request = None
+        if key is not None:
+            for queued in state.queue:
+                if queued.key == key:
+                    request = queued
+                    break
+        if request is None:
+            request = _Request(
+                key, operation, state.loop.create_future(), contextvars.copy_context()
+            )
+        else:
+            # Superseded: run the newer operation, in the newer one's place
+            resource_coalesced.inc(resource)
+            state.queue.remove(request)
+            request.operation = operation
+            request.context = contextvars.copy_context()
+        state.queue.append(request)
+
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.ensure_future(self._drain(resource, state))
+        # Shield so one caller being cancelled doesn't cancel the shared work
+        return await asyncio.shield(request.future)
+
+    async def _drain(self, name: str, state: _Resource) -> None:
+        while state.queue:
+            request = state.queue.pop(0)
+            self.stats[name].performed += 1
+            try:
+                result = await state.loop.create_task(
+                    request.operation(), context=request.context
+                )
+            except asyncio.CancelledError:
+                request.future.cancel()
+                for queued in state.queue:
+                    queued.future.cancel()
+                state.queue.clear()
+                raise
+            except Exception as e:
+                request.future.set_exception(e)
+            else:
+                request.future.set_result(result)
+
+
+resource_coordinator = ResourceCoordinator()
@@ -0,0 +1,110 @@
+import asyncio
+import os
+from dataclasses import dataclass
+
+from server.utils.deadline import time_left
+from server.utils.resources import resource_coordinator
+from server.utils.subprocess_runner import run_command_async, run_sudo_command_async
+
+# Seconds to hold a restart request so later requests for the same unit
+# can share it
+RESTART_WINDOW = float(os.environ.get("RLN_RESTART_WINDOW", "1.0"))
+
+# Seconds to wait for a restarted unit to report active
+ACTIVE_TIMEOUT = 30
+ACTIVE_POLL_INTERVAL = 0.5
+
+
+@dataclass
+class RestartStats:
+    requested: int = 0
+    performed: int = 0
+
+    @property
+    def avoided(self) -> int:
+        return self.requested - self.performed
+
+
+async def read_unit_state(unit: str) -> tuple[str, str]:
+    """The unit's InvocationID and ActiveState, empty if they cannot be read"""
+    result = await run_command_async(
+        ["systemctl", "show", "-p", "InvocationID", "-p", "ActiveState", unit]
+    )
+    properties = dict(
+        line.split("=", 1) for line in result.stdout.splitlines() if "=" in line
+    )
+    return properties.get("InvocationID", ""), properties.get("ActiveState", "")
+
+
+async def wait_for_active(
+    unit: str, previous_invocation: str, timeout: float = ACTIVE_TIMEOUT
+) -> bool:
+    """Poll until a new instance of the unit is active, has failed, or timeout
+
+    The instance running before the restart, `previous_invocation`, does
+    not count, whether active or failed: `systemctl restart --no-block`
+    returns before systemd has stopped it. Gives up early when the request
+    deadline passes.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + time_left(timeout)
+    while True:
+        invocation, state = await read_unit_state(unit)
+        if invocation != previous_invocation:
+            if state == "active":
+                return True
+            if state == "failed":
+                return False
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(ACTIVE_POLL_INTERVAL)
+
+
+class RestartScheduler:
+    """
+    Coalesce systemd restarts per unit.
+
+    The first request for a unit schedules a restart `window` seconds later;
+    every request that arrives before that restart starts shares it and gets
+    its result. A request made while a restart is already running schedules
+    a new one, since the caller's change may have landed after the unit read
+    its configuration. That restart waits for the running one to finish,
+    and restarts queued behind it are merged into one.
+    """
+
+    def __init__(self, window: float = RESTART_WINDOW):
+        self.window = window
+        self._pending: dict[str, asyncio.Future[tuple[bool, str]]] = {}
+        self.stats: dict[str, RestartStats] = {}
+
+    async def request_restart(self, unit: str) -> tuple[bool, str]:
+        """Restart `unit`, sharing the restart with concurrent requests"""
+        self.stats.setdefault(unit, RestartStats()).requested += 1
+        pending = self._pending.get(unit)
+        if pending is None or pending.get_loop() is not asyncio.get_running_loop():
+            pending = asyncio.ensure_future(self._restart_after_window(unit))
+            self._pending[unit] = pending
+        return await asyncio.shield(pending)
+
+    async def _restart_after_window(self, unit: str) -> tuple[bool, str]:
+        await asyncio.sleep(self.window)
+        # From here on, new requests must schedule their own restart
+        self._pending.pop(unit, None)
+        return await resource_coordinator.submit(
+            unit, lambda: self._restart(unit), key="restart"
+        )
+
+    async def _restart(self, unit: str) -> tuple[bool, str]:
+        self.stats[unit].performed += 1
+        previous_invocation, _ = await read_unit_state(unit)
+        result = await run_sudo_command_async(
+            ["systemctl", "restart", "--no-block", unit]
+        )
+        if not result.success:
+            return False, result.stderr
+        if not await wait_for_active(unit, previous_invocation):
+            return False, f"{unit} did not become active after restart"
+        return True, f"{unit} restarted"
+
+
+restart_scheduler = RestartScheduler()
@@ -0,0 +1,131 @@
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Precompressed siblings written by the UI build, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# SvelteKit puts content-hashed assets under this prefix; their names change
+# whenever their bytes do, so they can be cached forever
+IMMUTABLE_PREFIX = "_app/immutable/"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+@dataclass
+class _Digest:
+    key: tuple[int, int, int]
+    etag: str
+
+
+_digests: dict[str, _Digest] = {}
+
+
+def content_etag(path: str, stat_result: os.stat_result) -> str:
+    """Strong ETag from the file's bytes, recomputed only when the file changes"""
+    key = (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+    cached = _digests.get(path)
+    if cached is not None and cached.key == key:
+        return cached.etag
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()[:32]}"'
+    _digests[path] = _Digest(key=key, etag=etag)
+    return etag
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Content codings the client accepts, ignoring any with q=0"""
+    accepted = set()
+    for part in header.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding and weight > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves `.br`/`.gz` siblings by Accept-Encoding.
+
+    Responses carry a content-hash ETag and are marked immutable when they
+    live under the SvelteKit hashed asset directory; everything else must be
+    revalidated, which is answered with a 304 when the ETag still matches.
+    """
+
+    def file_response(
+        self,
+        full_path: os.PathLike | str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = os.fspath(full_path)
+        served_path, served_stat, encoding = self.select_encoding(
+            full_path, stat_result, request_headers.get("accept-encoding", "")
+        )
+
+        etag = content_etag(served_path, served_stat)
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": self.cache_control(scope),
+        }
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+
+        # Typed from the original name; guessing from the served one would
+        # give application/gzip for the compressed copies
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        response = FileResponse(
+            served_path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=served_stat,
+        )
+        if status_code == 200 and self.is_not_modified(
+            response.headers, request_headers
+        ):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def select_encoding(
+        self, full_path: str, stat_result: os.stat_result, accept_encoding: str
+    ) -> tuple[str, os.stat_result, str | None]:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted and "*" not in accepted:
+                continue
+            try:
+                compressed_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            if compressed_stat.st_size < stat_result.st_size:
+                return full_path + suffix, compressed_stat, encoding
+        return full_path, stat_result, None
+
+    def cache_control(self, scope: Scope) -> str:
+        path = self.get_path(scope).replace(os.sep, "/")
+        if path.startswith(IMMUTABLE_PREFIX):
+            return IMMUTABLE_CACHE_CONTROL
+        return REVALIDATE_CACHE_CONTROL
@@ -1,6 +1,48 @@
+import asyncio
+import os
+import signal
 import subprocess
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Literal, Optional
+
+from server.utils.deadline import DEADLINE_EXCEEDED, command_timeout
+from server.utils.metrics import observe_command
+
+# Upper bound on child processes spawned concurrently by the async runner.
+MAX_CONCURRENT_COMMANDS = int(os.environ.get("RLN_MAX_CONCURRENT_COMMANDS", "4"))
+
+_command_slots: asyncio.Semaphore | None = None
+
+# Replaces process creation in the async runner when set; used by benchmarks
+# and local development to simulate system commands
+CommandSimulator = Callable[[List[str], int, Optional[str]], Awaitable["CommandResult"]]
+_command_simulator: CommandSimulator | None = None
+
+# Lines of each stream kept in the CommandResult of a streamed command
+STREAM_KEEP_LINES = int(os.environ.get("RLN_STREAM_KEEP_LINES", "200"))
+
+# Lines read but not yet consumed before the reader stops draining the pipe
+STREAM_PENDING_LINES = 256
+
+# Longer lines are split so one runaway line cannot grow the buffer
+MAX_LINE_LENGTH = 4096
+
+OutputStream = Literal["stdout", "stderr"]
+
+# Bytes kept from the start and from the end of each captured stream; output
+# in between is dropped and replaced by a marker
+CAPTURE_HEAD_BYTES = int(os.environ.get("RLN_CAPTURE_HEAD_BYTES", str(64 * 1024)))
+CAPTURE_TAIL_BYTES = int(os.environ.get("RLN_CAPTURE_TAIL_BYTES", str(64 * 1024)))
+
+# Size of each read from a child's pipe
+CAPTURE_CHUNK = 65536
+
+# Seconds a timed out or cancelled command's process group gets to exit
+# after SIGTERM before it is sent SIGKILL
+KILL_GRACE = 2
 
 
 @dataclass
@@ -11,6 +53,78 @@ class CommandResult:
     return_code: int
 
 
+class OutputCapture:
+    """
+    Bounded capture of one output stream.
+
+    Keeps the first `head` and the last `tail` bytes written. Anything in
+    between is counted but not kept, and text() marks where it was, so a
+    chatty command costs at most head + tail bytes however long it runs.
+    """
+
+    def __init__(self, head: int = CAPTURE_HEAD_BYTES, tail: int = CAPTURE_TAIL_BYTES):
+        self.head = head
+        self.tail = tail
+        self.dropped = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+
+    def write(self, data: bytes) -> None:
+        room = self.head - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if not data:
+            return
+        self._tail += data
+        excess = len(self._tail) - self.tail
+        if excess > 0:
+            del self._tail[:excess]
+            self.dropped += excess
+
+    def text(self) -> str:
+        if not self.dropped:
+            return (self._head + self._tail).decode(errors="replace")
+        return (
+            self._head.decode(errors="replace")
+            + f"\n[... {self.dropped} bytes of output omitted ...]\n"
+            + self._tail.decode(errors="replace")
+        )
+
+
+def _signal_group(pgid: int, sig: int) -> None:
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        # Gone already, or only root-owned members left; sudo relays the
+        # SIGTERM to those itself
+        pass
+
+
+def _capture_pipe(pipe: Any, capture: OutputCapture) -> None:
+    with pipe:
+        while chunk := pipe.read(CAPTURE_CHUNK):
+            capture.write(chunk)
+
+
+def _feed_pipe(pipe: Any, data: bytes) -> None:
+    try:
+        with pipe:
+            pipe.write(data)
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+
+
+def _kill_process_group_sync(process: subprocess.Popen[bytes]) -> None:
+    _signal_group(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        pass
+    _signal_group(process.pid, signal.SIGKILL)
+    process.wait()
+
+
 def run_command(
     args: List[str],
     timeout: int = 30,
@@ -20,6 +134,13 @@ def run_command(
     """
     Run a command safely with proper argument handling.
 
+    The command runs in its own process group, which is killed as a whole
+    on timeout. Each output stream keeps at most CAPTURE_HEAD_BYTES from
+    the start and CAPTURE_TAIL_BYTES from the end; see OutputCapture.
+
+    Inside a deadline_scope the timeout is cut to what is left of the
+    request's deadline, and once that has passed the command is not run.
+
     Args:
         args: List of command arguments (no shell expansion)
         timeout: Timeout in seconds
@@ -29,57 +150,299 @@ def run_command(
     Returns:
         CommandResult with success status, stdout, stderr, and return code
     """
+    timeout = command_timeout(timeout)
+    if timeout <= 0:
+        return _deadline_exceeded()
+    started = time.monotonic()
+    outcome = "failed"
     try:
-        result = subprocess.run(
+        process = subprocess.Popen(
             args,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            input=input_text,
+            stdin=subprocess.PIPE if input_text is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # Own process group, so a timeout can take down grandchildren too
+            start_new_session=True,
         )
-        success = result.returncode == 0
-
-        if check and not success:
-            raise subprocess.CalledProcessError(
-                result.returncode, args, result.stdout, result.stderr
-            )
-
+    except FileNotFoundError:
+        outcome = "not_found"
+        observe_command(args, time.monotonic() - started, outcome)
         return CommandResult(
-            success=success,
-            stdout=result.stdout,
-            stderr=result.stderr,
-            return_code=result.returncode,
+            success=False,
+            stdout="",
+            stderr=f"Command not found: {args[0]}",
+            return_code=-1,
         )
-    except subprocess.TimeoutExpired:
+    except Exception as e:
+        observe_command(args, time.monotonic() - started, outcome)
         return CommandResult(
             success=False,
             stdout="",
-            stderr=f"Command timed out after {timeout} seconds",
+            stderr=str(e),
             return_code=-1,
         )
+
+    stdout, stderr = OutputCapture(), OutputCapture()
+    workers = [
+        threading.Thread(
+            target=_capture_pipe, args=(process.stdout, stdout), daemon=True
+        ),
+        threading.Thread(
+            target=_capture_pipe, args=(process.stderr, stderr), daemon=True
+        ),
+    ]
+    if input_text is not None:
+        workers.append(
+            threading.Thread(
+                target=_feed_pipe,
+                args=(process.stdin, input_text.encode()),
+                daemon=True,
+            )
+        )
+    try:
+        for worker in workers:
+            worker.start()
+        deadline = started + timeout
+        try:
+            process.wait(timeout=max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            outcome = "timeout"
+        for worker in workers:
+            # A grandchild still holding a pipe open counts as a timeout
+            worker.join(timeout=max(deadline - time.monotonic(), 0))
+            if worker.is_alive():
+                outcome = "timeout"
+        if outcome == "timeout":
+            _kill_process_group_sync(process)
+            for worker in workers:
+                worker.join(timeout=KILL_GRACE)
+            return _timed_out(timeout)
+        success = process.returncode == 0
+        outcome = "ok" if success else "failed"
+    except BaseException:
+        _kill_process_group_sync(process)
+        raise
+    finally:
+        observe_command(args, time.monotonic() - started, outcome)
+
+    if check and not success:
+        raise subprocess.CalledProcessError(
+            process.returncode, args, stdout.text(), stderr.text()
+        )
+    return CommandResult(
+        success=success,
+        stdout=stdout.text(),
+        stderr=stderr.text(),
+        return_code=process.returncode,
+    )
+
+
+def run_sudo_command(
+    args: List[str],
+    timeout: int = 30,
+    input_text: Optional[str] = None,
+) -> CommandResult:
+    """
+    Run a command with sudo.
+
+    Args:
+        args: List of command arguments (sudo will be prepended)
+        timeout: Timeout in seconds
+        input_text: Optional input to pass to stdin
+
+    Returns:
+        CommandResult with success status, stdout, stderr, and return code
+    """
+    return run_command(["sudo"] + args, timeout=timeout, input_text=input_text)
+
+
+def set_max_concurrent_commands(limit: int) -> None:
+    """Change the cap on concurrently running child processes"""
+    global MAX_CONCURRENT_COMMANDS, _command_slots
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    MAX_CONCURRENT_COMMANDS = limit
+    _command_slots = None
+
+
+def set_command_simulator(simulator: CommandSimulator | None) -> None:
+    """Route async commands to `simulator` instead of real processes (None restores)"""
+    global _command_simulator
+    _command_simulator = simulator
+
+
+def _get_command_slots() -> asyncio.Semaphore:
+    global _command_slots
+    if _command_slots is None:
+        _command_slots = asyncio.Semaphore(MAX_CONCURRENT_COMMANDS)
+    return _command_slots
+
+
+async def _kill_process(process: asyncio.subprocess.Process) -> None:
+    """Terminate the command's whole process group, then SIGKILL what is left"""
+    _signal_group(process.pid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), KILL_GRACE)
+    except asyncio.TimeoutError:
+        pass
+    _signal_group(process.pid, signal.SIGKILL)
+    await process.wait()
+
+
+async def _capture_stream(reader: asyncio.StreamReader, capture: OutputCapture) -> None:
+    while chunk := await reader.read(CAPTURE_CHUNK):
+        capture.write(chunk)
+
+
+async def _feed_stream(
+    writer: asyncio.StreamWriter | None, input_text: Optional[str]
+) -> None:
+    if writer is None:
+        return
+    try:
+        if input_text is not None:
+            writer.write(input_text.encode())
+            await writer.drain()
+        writer.close()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+
+
+def _deadline_exceeded() -> CommandResult:
+    return CommandResult(
+        success=False,
+        stdout="",
+        stderr=DEADLINE_EXCEEDED,
+        return_code=-1,
+    )
+
+
+def _timed_out(timeout: int) -> CommandResult:
+    return CommandResult(
+        success=False,
+        stdout="",
+        stderr=f"Command timed out after {timeout} seconds",
+        return_code=-1,
+    )
+
+
+async def _execute(
+    args: List[str], timeout: int, input_text: Optional[str]
+) -> tuple[CommandResult, str]:
+    """Run one command, returning its result and a metrics outcome label"""
+    if _command_simulator is not None:
+        try:
+            result = await asyncio.wait_for(
+                _command_simulator(args, timeout, input_text), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            return _timed_out(timeout), "timeout"
+        return result, "ok" if result.success else "failed"
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=(
+                asyncio.subprocess.PIPE
+                if input_text is not None
+                else asyncio.subprocess.DEVNULL
+            ),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
     except FileNotFoundError:
-        return CommandResult(
+        result = CommandResult(
             success=False,
             stdout="",
             stderr=f"Command not found: {args[0]}",
             return_code=-1,
         )
+        return result, "not_found"
     except Exception as e:
-        return CommandResult(
+        result = CommandResult(
             success=False,
             stdout="",
             stderr=str(e),
             return_code=-1,
         )
+        return result, "failed"
+
+    assert process.stdout is not None and process.stderr is not None
+    stdout, stderr = OutputCapture(), OutputCapture()
+    try:
+        async with asyncio.timeout(timeout):
+            await asyncio.gather(
+                _feed_stream(process.stdin, input_text),
+                _capture_stream(process.stdout, stdout),
+                _capture_stream(process.stderr, stderr),
+                process.wait(),
+            )
+    except asyncio.TimeoutError:
+        await _kill_process(process)
+        return _timed_out(timeout), "timeout"
+    except BaseException:
+        await _kill_process(process)
+        raise
 
+    return_code = process.returncode if process.returncode is not None else -1
+    result = CommandResult(
+        success=return_code == 0,
+        stdout=stdout.text(),
+        stderr=stderr.text(),
+        return_code=return_code,
+    )
+    return result, "ok" if result.success else "failed"
 
-def run_sudo_command(
+
+async def run_command_async(
     args: List[str],
     timeout: int = 30,
+    check: bool = False,
     input_text: Optional[str] = None,
 ) -> CommandResult:
     """
-    Run a command with sudo.
+    Run a command without blocking the event loop.
+
+    Behaves like run_command, but waits on the child with asyncio. At most
+    MAX_CONCURRENT_COMMANDS children run at once; further callers queue.
+
+    Args:
+        args: List of command arguments (no shell expansion)
+        timeout: Timeout in seconds
+        check: If True, raise exception on non-zero return code
+        input_text: Optional input to pass to stdin
+
+    Returns:
+        CommandResult with success status, stdout, stderr, and return code
+    """
+    async with _get_command_slots():
+        # Time spent queued for a slot counts against the request deadline
+        timeout = command_timeout(timeout)
+        if timeout <= 0:
+            return _deadline_exceeded()
+        started = time.monotonic()
+        result, outcome = await _execute(args, timeout, input_text)
+        observe_command(args, time.monotonic() - started, outcome)
+
+    if check and not result.success:
+        raise subprocess.CalledProcessError(
+            result.return_code, args, result.stdout, result.stderr
+        )
+
+    return result
+
+
+async def run_sudo_command_async(
+    args: List[str],
+    timeout: int = 30,
+    input_text: Optional[str] = None,
+) -> CommandResult:
+    """
+    Run a command with sudo without blocking the event loop.
+
+    Goes through the privileged helper instead when RLN_PRIVILEGED_SOCKET is
+    set and the helper is reachable.
 
     Args:
         args: List of command arguments (sudo will be prepended)
@@ -89,4 +452,240 @@ def run_sudo_command(
     Returns:
         CommandResult with success status, stdout, stderr, and return code
     """
-    return run_command(["sudo"] + args, timeout=timeout, input_text=input_text)
+    from server.utils.privileged import run_privileged
+
+    timeout = command_timeout(timeout)
+    if timeout <= 0:
+        return _deadline_exceeded()
+    result = await run_privileged(args, timeout=timeout, input_text=input_text)
+    if result is not None:
+        return result
+    return await run_command_async(
+        ["sudo"] + args, timeout=timeout, input_text=input_text
+    )
+
+
+@dataclass
+class OutputLine:
+    stream: OutputStream
+    text: str
+
+
+class CommandStream:
+    """
+    Output of a running command, line by line as it is written.
+
+    Use as `async with stream_command_async(args) as stream`, iterate it for
+    OutputLine items, then read `stream.result`. Only STREAM_PENDING_LINES
+    unread lines are held; beyond that the child blocks on its pipe until the
+    consumer catches up. The result keeps the last STREAM_KEEP_LINES lines of
+    each stream. Leaving the block early kills the command.
+    """
+
+    def __init__(
+        self,
+        args: List[str],
+        timeout: int = 30,
+        input_text: Optional[str] = None,
+        keep_lines: int = STREAM_KEEP_LINES,
+    ):
+        self.args = args
+        self.timeout = timeout
+        self.input_text = input_text
+        self.result: CommandResult | None = None
+        self._lines: asyncio.Queue[OutputLine | None] = asyncio.Queue(
+            maxsize=STREAM_PENDING_LINES
+        )
+        self._kept: dict[OutputStream, deque[str]] = {
+            "stdout": deque(maxlen=keep_lines),
+            "stderr": deque(maxlen=keep_lines),
+        }
+        self._task: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> "CommandStream":
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        if self._task is None:
+            return
+        if not self._task.done():
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def __aiter__(self) -> AsyncIterator[OutputLine]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[OutputLine]:
+        while (line := await self._lines.get()) is not None:
+            yield line
+
+    async def _emit(self, stream: OutputStream, text: str) -> None:
+        self._kept[stream].append(text)
+        await self._lines.put(OutputLine(stream, text))
+
+    def _captured(self, stream: OutputStream) -> str:
+        return "".join(f"{line}\n" for line in self._kept[stream])
+
+    async def _pump(self, reader: asyncio.StreamReader, stream: OutputStream) -> None:
+        pending = b""
+        while chunk := await reader.read(MAX_LINE_LENGTH):
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            while len(pending) >= MAX_LINE_LENGTH:
+                lines.append(pending[:MAX_LINE_LENGTH])
+                pending = pending[MAX_LINE_LENGTH:]
+            for line in lines:
+                await self._emit(stream, line.rstrip(b"\r").decode(errors="replace"))
+        if pending:
+            await self._emit(stream, pending.rstrip(b"\r").decode(errors="replace"))
+
+    async def _run(self) -> None:
+        try:
+            async with _get_command_slots():
+                started = time.monotonic()
+                outcome = "failed"
+                try:
+                    self.result, outcome = await self._stream()
+                finally:
+                    observe_command(self.args, time.monotonic() - started, outcome)
+        except asyncio.CancelledError:
+            # Nobody is iterating any more, so no end marker is needed
+            self.result = self.result or CommandResult(
+                success=False,
+                stdout=self._captured("stdout"),
+                stderr="Command cancelled",
+                return_code=-1,
+            )
+            raise
+        except Exception as e:
+            self.result = CommandResult(
+                success=False,
+                stdout=self._captured("stdout"),
+                stderr=str(e),
+                return_code=-1,
+            )
+        await self._lines.put(None)
+
+    async def _stream(self) -> tuple[CommandResult, str]:
+        if _command_simulator is not None:
+            result, outcome = await _execute(self.args, self.timeout, self.input_text)
+            for stream in ("stdout", "stderr"):
+                text = result.stdout if stream == "stdout" else result.stderr
+                for line in text.splitlines():
+                    await self._emit(stream, line)
+            return result, outcome
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.args,
+                stdin=(
+                    asyncio.subprocess.PIPE
+                    if self.input_text is not None
+                    else asyncio.subprocess.DEVNULL
+                ),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+        except FileNotFoundError:
+            result = CommandResult(
+                success=False,
+                stdout="",
+                stderr=f"Command not found: {self.args[0]}",
+                return_code=-1,
+            )
+            return result, "not_found"
+        except Exception as e:
+            result = CommandResult(
+                success=False, stdout="", stderr=str(e), return_code=-1
+            )
+            return result, "failed"
+
+        assert process.stdout is not None and process.stderr is not None
+        try:
+            async with asyncio.timeout(self.timeout):
+                await asyncio.gather(
+                    _feed_stream(process.stdin, self.input_text),
+                    self._pump(process.stdout, "stdout"),
+                    self._pump(process.stderr, "stderr"),
+                    process.wait(),
+                )
+        except asyncio.TimeoutError:
+            await _kill_process(process)
+            result = CommandResult(
+                success=False,
+                stdout=self._captured("stdout"),
+                stderr=f"Command timed out after {self.timeout} seconds",
+                return_code=-1,
+            )
+            return result, "timeout"
+        except BaseException:
+            await _kill_process(process)
+            raise
+
+        return_code = process.returncode if process.returncode is not None else -1
+        result = CommandResult(
+            success=return_code == 0,
+            stdout=self._captured("stdout"),
+            stderr=self._captured("stderr"),
+            return_code=return_code,
+        )
+        return result, "ok" if result.success else "failed"
+
+
+def stream_command_async(
+    args: List[str],
+    timeout: int = 30,
+    input_text: Optional[str] = None,
+) -> CommandStream:
+    """
+    Run a command and yield its output lines as they arrive.
+
+    Args:
+        args: List of command arguments (no shell expansion)
+        timeout: Timeout in seconds for the whole command
+        input_text: Optional input to pass to stdin
+
+    Returns:
+        CommandStream to use with `async with` and `async for`
+    """
+    return CommandStream(args, timeout=command_timeout(timeout), input_text=input_text)
+
+
+async def run_sudo_command_streaming(
+    args: List[str],
+    on_line: Callable[[OutputLine], None],
+    timeout: int = 30,
+    input_text: Optional[str] = None,
+) -> CommandResult:
+    """
+    Run a command with sudo, passing each output line to `on_line`.
+
+    Args:
+        args: List of command arguments (sudo will be prepended)
+        on_line: Called with every stdout/stderr line as it is written
+        timeout: Timeout in seconds for the whole command
+        input_text: Optional input to pass to stdin
+
+    Returns:
+        CommandResult with the last STREAM_KEEP_LINES lines of each stream
+    """
+    from server.utils.privileged import run_privileged
+
+    timeout = command_timeout(timeout)
+    if timeout <= 0:
+        return _deadline_exceeded()
+    result = await run_privileged(args, timeout, input_text, on_line)
+    if result is not None:
+        return result
+    async with stream_command_async(
+        ["sudo"] + args, timeout=timeout, input_text=input_text
+    ) as stream:
+        async for line in stream:
+            on_line(line)
+    assert stream.result is not None
+    return stream.result
@@ -0,0 +1,14 @@
+# Shapes of values the API passes to root commands, checked by the API
+# models and again by the privileged helper. Like paths.py, kept free of
+# server imports so the helper loads none of the web stack.
+
+import re
+
+# AllStarLink node numbers
+NODE_NUMBER = re.compile(r"[0-9]{1,9}")
+
+# Amateur radio callsigns, with an optional /suffix
+CALLSIGN = re.compile(r"[A-Za-z0-9]{1,10}(/[A-Za-z0-9]{1,4})?")
+
+# Passwords: any text without control characters, newlines included
+PASSWORD = re.compile(r"[^\x00-\x1f\x7f]*")